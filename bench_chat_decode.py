@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# bench_chat_decode.py
+#
+# Times per-page decode + JSON parse of chat API bodies, comparing the original
+# decode_body/parse_chat_payload path against weverse_chat_decode.
+#
+#   python bench_chat_decode.py --chat weverse_chat.json --page-size 50
+
+import argparse
+import gzip
+import json
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import weverse_chat_decode
+from weverse_chat_archive import load_messages
+from weverse_chat_decode import brotli, parse_chat_body, zstandard
+
+
+def legacy_parse(body: bytes, enc: str) -> Any:
+    # Baseline: the pre-weverse_chat_decode implementation.
+    enc = enc.lower()
+    raw = body
+    if "gzip" in enc:
+        raw = gzip.decompress(body)
+    elif "br" in enc:
+        import brotli as _brotli
+        raw = _brotli.decompress(body)
+    elif "zstd" in enc:
+        import zstandard as _zstd
+        raw = _zstd.ZstdDecompressor().decompress(body)
+    return json.loads(raw.decode("utf-8", errors="replace"))
+
+
+def encoders() -> Dict[str, Callable[[bytes], bytes]]:
+    out: Dict[str, Callable[[bytes], bytes]] = {
+        "identity": lambda b: b,
+        "gzip": gzip.compress,
+    }
+    if brotli is not None:
+        out["br"] = brotli.compress
+    if zstandard is not None:
+        cctx = zstandard.ZstdCompressor()
+        out["zstd"] = cctx.compress
+    return out
+
+
+def build_pages(msgs: List[Dict[str, Any]], page_size: int) -> List[bytes]:
+    pages = []
+    for i in range(0, len(msgs), page_size):
+        page = {"data": msgs[i : i + page_size]}
+        pages.append(json.dumps(page, ensure_ascii=False).encode("utf-8"))
+    return pages
+
+
+def time_parser(fn: Callable[[bytes, str], Any], bodies: List[bytes], enc: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for body in bodies:
+            fn(body, enc)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chat", required=True, help="Chat JSON/NDJSON/.wvca from weverse_chat_dump")
+    ap.add_argument("--page-size", type=int, default=50, help="Messages per synthetic API page")
+    ap.add_argument("--repeat", type=int, default=5, help="Repetitions; best time is reported")
+    args = ap.parse_args()
+
+    msgs = load_messages(args.chat)
+
+    pages = build_pages(msgs, max(1, args.page_size))
+    if not pages:
+        raise SystemExit("No messages in chat file.")
+
+    print(f"{len(pages)} pages x {args.page_size} msgs, orjson={'yes' if weverse_chat_decode.orjson else 'no'}")
+    rows: List[Tuple[str, float, float]] = []
+    for enc, compress in encoders().items():
+        bodies = [compress(p) for p in pages]
+        header = "" if enc == "identity" else enc
+        legacy = time_parser(legacy_parse, bodies, header, args.repeat)
+        current = time_parser(parse_chat_body, bodies, header, args.repeat)
+        rows.append((enc, legacy, current))
+
+    print(f"{'encoding':<10} {'legacy us/page':>15} {'current us/page':>16} {'speedup':>8}")
+    for enc, legacy, current in rows:
+        n = len(pages)
+        print(f"{enc:<10} {legacy / n * 1e6:>15.1f} {current / n * 1e6:>16.1f} {legacy / current:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# bench_chat_dump.py
+#
+# Offline benchmark of the weverse_chat_dump harvest loop against recorded traffic.
+#
+#   python weverse_chat_dump.py ... --record-fixture chat_fixture.ndjson   (record once)
+#   python bench_chat_dump.py --fixture chat_fixture.ndjson
+#   python bench_chat_dump.py --chat weverse_chat.json --encoding br --profile harvest.pstats
+
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import tempfile
+import time
+
+from weverse_chat_archive import load_messages
+from weverse_chat_dump import harvest_by_scrolling
+from weverse_chat_index import DedupeIndex
+from weverse_chat_replay import ReplayDriver, fixture_from_chat, load_fixture
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--fixture", help="Recorded NDJSON fixture (weverse_chat_dump --record-fixture)")
+    src.add_argument("--chat", help="Chat JSON/NDJSON/.wvca to turn into synthetic pages")
+    ap.add_argument("--page-size", type=int, default=50, help="Messages per page for --chat")
+    ap.add_argument("--encoding", default="gzip", choices=["", "gzip", "br", "zstd"], help="Body encoding for --chat")
+    ap.add_argument("--pages-per-scroll", type=int, default=1, help="Pages captured per scroll round")
+    ap.add_argument("--parse-workers", type=int, default=2)
+    ap.add_argument("--parse-processes", action="store_true")
+    ap.add_argument("--profile", help="Write a cProfile pstats file of the harvest")
+    ap.add_argument("--verbose", action="store_true", help="Show the harvester's per-round output")
+    args = ap.parse_args()
+
+    if args.fixture:
+        pages = load_fixture(args.fixture)
+    else:
+        msgs = load_messages(args.chat)
+        pages = fixture_from_chat(msgs, page_size=max(1, args.page_size), encoding=args.encoding)
+
+    body_bytes = sum(len(body) for _, _, body in pages)
+    driver = ReplayDriver(pages, pages_per_scroll=max(1, args.pages_per_scroll))
+    profiler = cProfile.Profile() if args.profile else None
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out) if not args.verbose else contextlib.nullcontext():
+        t0 = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        all_msgs = harvest_by_scrolling(
+            driver,
+            DedupeIndex(),
+            parse_workers=args.parse_workers,
+            parse_processes=args.parse_processes,
+            max_idle_rounds=1,
+            request_timeout=0.0,
+            idle_pause=0.0,
+        )
+        t_harvest = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        all_msgs.sort(key=lambda m: m.get("messageTime", 0))
+        fd, tmp_path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(all_msgs, f, ensure_ascii=False, indent=2)
+        t_write = time.perf_counter() - t1
+        if profiler:
+            profiler.disable()
+    os.remove(tmp_path)
+
+    n_pages = len(pages)
+    print(f"pages={n_pages} messages={len(all_msgs)} body_bytes={body_bytes}")
+    print(f"harvest: {t_harvest:.3f}s  ({n_pages / t_harvest:.0f} pages/s, {len(all_msgs) / t_harvest:.0f} msgs/s)")
+    print(f"write:   {t_write:.3f}s")
+
+    if profiler:
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# bench_chat_to_ass.py
+#
+# Benchmarks the chat -> ASS pipeline stages of weverse_chat_to_ass_twitch on
+# synthetic Weverse chat.
+#
+#   python bench_chat_to_ass.py --sizes 10000,100000 --max-lines 6,12 --hold 30,3600
+#   python bench_chat_to_ass.py --save-baseline bench_baseline.json
+#   python bench_chat_to_ass.py --compare bench_baseline.json --tolerance 0.2
+#
+# Each stage time is the best of --repeat runs, so one slow run does not trip --compare.
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from weverse_chat_to_ass_twitch import (
+    build_twitch_segments,
+    estimate_max_cells,
+    make_ass,
+    make_ass_stacked,
+    pick_fields,
+    wrap_message_text,
+)
+
+KOREAN = "가나다라마바사아자차카타파하ㅋㅎㅠ"
+EMOJI = "😀😂🥰😭👍🔥💕✨🎉🖤"
+ASCII = "abcdefghijklmnopqrstuvwxyz"
+
+
+def random_word(rng: random.Random, mix: Tuple[float, float, float], length: int) -> str:
+    pools = (KOREAN, EMOJI, ASCII)
+    pool = rng.choices(pools, weights=mix)[0]
+    return "".join(rng.choice(pool) for _ in range(length))
+
+
+def generate_chat(
+    count: int,
+    rate: float = 10.0,
+    mix: Tuple[float, float, float] = (0.6, 0.15, 0.25),
+    long_token_ratio: float = 0.02,
+    burst_ratio: float = 0.1,
+    burst_factor: float = 20.0,
+    seed: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    Synthetic paginator objects: Poisson arrivals at `rate` msgs/sec, with a
+    `burst_ratio` share of time spent at `rate * burst_factor`.
+    """
+    rng = random.Random(seed)
+    t_ms = 1_700_000_000_000.0
+    items: List[Dict[str, Any]] = []
+    for i in range(count):
+        cur_rate = rate * burst_factor if rng.random() < burst_ratio else rate
+        t_ms += rng.expovariate(cur_rate) * 1000.0
+        if rng.random() < long_token_ratio:
+            words = [random_word(rng, mix, rng.randint(40, 120))]
+        else:
+            words = [random_word(rng, mix, rng.randint(1, 8)) for _ in range(rng.randint(1, 10))]
+        items.append(
+            {
+                "messageTime": int(t_ms),
+                "userId": str(rng.randint(1, 5000)),
+                "content": " ".join(words),
+                "profile": {"profileName": random_word(rng, mix, rng.randint(2, 10))},
+            }
+        )
+    return items
+
+
+def run_stage(fn: Callable[[], Any], measure_memory: bool, repeat: int = 1) -> Tuple[Any, float, int]:
+    """Result of fn, its best time over `repeat` runs, and the peak memory of one extra traced run."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    peak = 0
+    if measure_memory:
+        # Traced separately: tracemalloc slows allocation-heavy stages down a lot.
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def bench_case(
+    items: List[Dict[str, Any]],
+    max_lines: int,
+    hold: float,
+    measure_memory: bool,
+    coalesce: bool = False,
+    repeat: int = 1,
+) -> Dict[str, Any]:
+    max_cells = estimate_max_cells(resx=1080, margin_l=10, margin_r=10, font_size=36, outline=2)
+    stats: Dict[str, Any] = {}
+
+    def do_pick() -> List[Tuple[Any, str, str]]:
+        return [pick_fields(item) for item in items]
+
+    picked, stats["pick_fields_s"], stats["pick_fields_peak"] = run_stage(do_pick, measure_memory, repeat)
+    base = picked[0][0]
+
+    def do_wrap() -> List[Tuple[float, str, str, int]]:
+        out = []
+        for ts, name, msg in picked:
+            wrapped, line_count = wrap_message_text(name, msg, max_cells)
+            out.append(((ts - base) / 1000.0, name, wrapped, line_count))
+        return out
+
+    msgs_in, stats["wrap_s"], stats["wrap_peak"] = run_stage(do_wrap, measure_memory, repeat)
+
+    chat_msgs, stats["simulate_s"], stats["simulate_peak"] = run_stage(
+        lambda: build_twitch_segments(msgs_in=msgs_in, hold=hold, max_lines=max_lines),
+        measure_memory,
+        repeat,
+    )
+
+    ass_text, stats["make_ass_s"], stats["make_ass_peak"] = run_stage(
+        lambda: make_ass(
+            chat_msgs=chat_msgs,
+            resx=1080,
+            resy=1920,
+            margin_l=10,
+            margin_r=10,
+            margin_v=10,
+            font_name="Nanum Gothic",
+            font_size=36,
+            outline=2,
+            shadow=0,
+            line_gap=2,
+            shift=0.0,
+            fade_out=0.0,
+        ),
+        measure_memory,
+        repeat,
+    )
+
+    if coalesce:
+        stacked, stats["stacked_ass_s"], stats["stacked_ass_peak"] = run_stage(
+            lambda: make_ass_stacked(
+                chat_msgs=chat_msgs,
+                resx=1080,
+                resy=1920,
+                margin_l=10,
+                margin_r=10,
+                margin_v=10,
+                font_name="Nanum Gothic",
+                font_size=36,
+                outline=2,
+                shadow=0,
+            ),
+            measure_memory,
+            repeat,
+        )
+        stats["stacked_events"] = stacked.count("\nDialogue: ")
+        stats["stacked_bytes"] = len(stacked.encode("utf-8"))
+
+    total = sum(stats[k] for k in ("pick_fields_s", "wrap_s", "simulate_s", "make_ass_s"))
+    stats["total_s"] = total
+    stats["msgs_per_s"] = len(items) / total if total > 0 else 0.0
+    stats["segments"] = sum(len(m.segments) for m in chat_msgs)
+    stats["ass_bytes"] = len(ass_text.encode("utf-8"))
+    return stats
+
+
+def parse_list(text: str, cast: Callable[[str], Any]) -> List[Any]:
+    return [cast(x) for x in text.split(",") if x.strip()]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,50000", help="Comma-separated message counts")
+    ap.add_argument("--max-lines", default="6", help="Comma-separated --max-lines values")
+    ap.add_argument("--hold", default="3600", help="Comma-separated --hold values (seconds)")
+    ap.add_argument("--rate", type=float, default=10.0, help="Mean messages per second")
+    ap.add_argument("--mix", default="0.6,0.15,0.25", help="Korean,emoji,ASCII word weights")
+    ap.add_argument("--long-token-ratio", type=float, default=0.02)
+    ap.add_argument("--burst-ratio", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per stage; the best time is reported and compared")
+    ap.add_argument("--memory", action="store_true", help="Also record peak memory per stage (slower)")
+    ap.add_argument("--coalesce", action="store_true", help="Also time make_ass_stacked and compare output size")
+    ap.add_argument("--save-baseline", help="Write results to this JSON file")
+    ap.add_argument("--compare", help="Compare against a baseline JSON; exit 1 on regression")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown fraction for --compare")
+    args = ap.parse_args()
+
+    mix = tuple(parse_list(args.mix, float))
+    results: Dict[str, Dict[str, Any]] = {}
+
+    print(f"{'case':<28} {'pick':>8} {'wrap':>8} {'sim':>8} {'ass':>8} {'msg/s':>10} {'segments':>10}")
+    for size in parse_list(args.sizes, int):
+        items = generate_chat(
+            size,
+            rate=args.rate,
+            mix=mix,
+            long_token_ratio=args.long_token_ratio,
+            burst_ratio=args.burst_ratio,
+            seed=args.seed,
+        )
+        for max_lines in parse_list(args.max_lines, int):
+            for hold in parse_list(args.hold, float):
+                case = f"n={size} lines={max_lines} hold={hold:g}"
+                st = bench_case(items, max_lines, hold, args.memory, args.coalesce, args.repeat)
+                results[case] = st
+                print(
+                    f"{case:<28} {st['pick_fields_s']:>8.3f} {st['wrap_s']:>8.3f} {st['simulate_s']:>8.3f}"
+                    f" {st['make_ass_s']:>8.3f} {st['msgs_per_s']:>10.0f} {st['segments']:>10}"
+                )
+                if args.coalesce:
+                    print(
+                        f"{'':<28} coalesced: {st['stacked_ass_s']:.3f}s, {st['stacked_events']} lines"
+                        f" vs {st['segments']}, {st['stacked_bytes'] / 1e6:.1f}MB vs {st['ass_bytes'] / 1e6:.1f}MB"
+                    )
+                if args.memory:
+                    peaks = ", ".join(
+                        f"{k[:-5]}={st[k] / 1e6:.1f}MB" for k in st if k.endswith("_peak")
+                    )
+                    print(f"{'':<28} peak: {peaks}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = 0
+        for case, st in results.items():
+            old = baseline.get(case)
+            if not old:
+                continue
+            for key in ("pick_fields_s", "wrap_s", "simulate_s", "make_ass_s", "total_s"):
+                if old[key] > 0 and st[key] > old[key] * (1 + args.tolerance):
+                    regressions += 1
+                    print(f"REGRESSION {case} {key}: {old[key]:.3f}s -> {st[key]:.3f}s")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+"""
+asyncio core for HTTP work: hundreds of requests in flight from one thread.
+
+    async with AsyncHTTP(concurrency=64) as http:
+        body, encoding = await http.get(url, headers)
+
+    results = run_async(main_coroutine())
+
+Uses aiohttp when it is installed (pip install aiohttp). Without it, each request
+runs urllib on a worker pool sized to `concurrency`, and callers still see the same
+coroutine API. Bodies come back undecoded together with their Content-Encoding,
+the same way selenium-wire hands over captured responses, so weverse_chat_decode
+handles both.
+"""
+
+import asyncio
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Dict, Optional, Tuple, TypeVar
+
+from weverse_metrics import METRICS
+
+try:
+    import aiohttp  # optional: native asyncio sockets
+except ImportError:
+    aiohttp = None
+
+T = TypeVar("T")
+
+
+class HTTPStatusError(Exception):
+    """Non-2xx response; keeps the status and headers so callers can back off."""
+
+    def __init__(self, url: str, status: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+        self.headers = headers or {}
+
+
+def _urllib_get(url: str, headers: Dict[str, str], timeout: float) -> Tuple[bytes, str]:
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.read(), resp.headers.get("Content-Encoding") or ""
+    except urllib.error.HTTPError as e:
+        raise HTTPStatusError(url, e.code, dict(e.headers or {})) from None
+
+
+class AsyncHTTP:
+    """Shared client with a cap on requests in flight."""
+
+    def __init__(self, concurrency: int = 32, timeout: float = 20.0):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._session = None
+        self._executor = None
+
+    async def __aenter__(self) -> "AsyncHTTP":
+        if aiohttp is not None:
+            self._session = aiohttp.ClientSession(
+                # Keep bodies raw; decoding happens in weverse_chat_decode.
+                auto_decompress=False,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="http")
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._session is not None:
+            await self._session.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    async def get(self, url: str, headers: Dict[str, str]) -> Tuple[bytes, str]:
+        """(body, Content-Encoding) of a GET; raises HTTPStatusError for non-2xx responses."""
+        async with self._slots:
+            t0 = time.perf_counter()
+            if self._session is not None:
+                async with self._session.get(url, headers=headers) as resp:
+                    body = await resp.read()
+                    if resp.status >= 400:
+                        raise HTTPStatusError(url, resp.status, dict(resp.headers))
+                    encoding = resp.headers.get("Content-Encoding") or ""
+            else:
+                loop = asyncio.get_running_loop()
+                body, encoding = await loop.run_in_executor(self._executor, _urllib_get, url, headers, self.timeout)
+            METRICS.observe("http_get", time.perf_counter() - t0)
+            METRICS.incr("http_requests")
+            METRICS.incr("bytes_fetched", len(body))
+            return body, encoding
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """Run a coroutine to completion from synchronous code."""
+    return asyncio.run(coro)
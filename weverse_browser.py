@@ -0,0 +1,76 @@
+"""
+Lightweight Chrome profile for scraping (--lite).
+
+    options = Options()
+    apply_lite_options(options)          # before webdriver.Chrome(...)
+    driver = webdriver.Chrome(options=options)
+    block_heavy_resources(driver)        # before the first driver.get(...)
+
+The pages are only read for their DOM and API traffic, so images, web fonts, video
+segments, ads and analytics are never fetched, autoplay is off (the player no longer
+buffers a live just to be seeked away from), and get() returns at DOMContentLoaded.
+HLS playlists still load, so the <video> element knows its duration.
+"""
+
+from weverse_metrics import METRICS
+
+# Network.setBlockedURLs patterns ('*' wildcards).
+BLOCKED_URL_PATTERNS = [
+    # images
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    # fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    # video/audio segments (playlists are kept)
+    "*.ts", "*.ts?*", "*.m4s", "*.m4s?*", "*.mp4", "*.mp4?*", "*.aac", "*.m4a",
+    # ads and analytics
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*branch.io*",
+]
+
+LITE_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.geolocation": 2,
+    "profile.default_content_setting_values.media_stream": 2,
+}
+
+LITE_ARGS = [
+    "--blink-settings=imagesEnabled=false",
+    "--autoplay-policy=user-gesture-required",
+    "--mute-audio",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=MediaRouter,Translate,OptimizationHints",
+    "--no-first-run",
+    "--disk-cache-size=1",
+    "--media-cache-size=1",
+]
+
+
+def apply_lite_options(options) -> None:
+    options.page_load_strategy = "eager"
+    for arg in LITE_ARGS:
+        options.add_argument(arg)
+    options.add_experimental_option("prefs", LITE_PREFS)
+
+
+def block_heavy_resources(driver) -> None:
+    """Drop image/font/media/tracker requests in the browser, before they reach the network."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        METRICS.incr("lite_browsers")
+    except Exception as e:
+        print(f"Resource blocking unavailable ({e}); continuing with the full page.")
+
+
+def add_browser_args(ap) -> None:
+    ap.add_argument(
+        "--lite",
+        action="store_true",
+        help="Scrape profile: no images/fonts/video/ads, no autoplay, eager page loads (less RAM and bandwidth per browser)",
+    )
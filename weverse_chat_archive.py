@@ -0,0 +1,182 @@
+"""
+Chat archive (.wvca): a compact binary log with a time index, read through mmap.
+
+    python weverse_chat_archive.py weverse_chat.json weverse_chat.wvca    # convert a JSON/NDJSON dump
+    python weverse_chat_archive.py weverse_chat.wvca --info
+
+    with ChatArchive("weverse_chat.wvca") as archive:
+        msgs = archive.slice(start_ms, end_ms)    # only this range is decoded
+
+Layout (little-endian):
+
+    magic    8 bytes  b"WVCHAT\\x00\\x01"
+    count    uint64
+    times    int64[count]       messageTime (else createTime/updateTime) in ms, ascending (-1 when missing)
+    offsets  uint64[count + 1]  record boundaries, relative to the start of records
+    records  compact UTF-8 JSON of each message, back to back
+
+A time range is two bisects over the mmapped times column; only the records in
+range are parsed, so a clip of a long live never loads the whole chat.
+weverse_chat_dump writes the format when --out ends in .wvca, and
+weverse_chat_to_ass_twitch reads it (with --from/--to for clips).
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Iterable, List, Optional
+
+from weverse_chat_decode import loads_json
+
+ARCHIVE_EXT = ".wvca"
+ARCHIVE_MAGIC = b"WVCHAT\x00\x01"
+_HEADER = struct.Struct("<8sQ")
+
+
+def message_time(m: dict) -> int:
+    # Same fallbacks as weverse_chat_to_ass_twitch.pick_fields.
+    ts = m.get("messageTime") or m.get("createTime") or m.get("updateTime")
+    try:
+        return int(ts)
+    except (TypeError, ValueError):
+        return -1
+
+
+def is_archive(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(ARCHIVE_MAGIC)) == ARCHIVE_MAGIC
+    except OSError:
+        return False
+
+
+def _little_endian(arr: array) -> array:
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def write_archive(path: str, msgs: Iterable[dict]) -> int:
+    """Write messages sorted by time (stable for equal times); returns the message count."""
+    items = sorted(msgs, key=message_time)
+    times = array("q", (message_time(m) for m in items))
+    offsets = array("Q", [0])
+    records = []
+    pos = 0
+    for m in items:
+        raw = json.dumps(m, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        records.append(raw)
+        pos += len(raw)
+        offsets.append(pos)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(ARCHIVE_MAGIC, len(items)))
+        f.write(_little_endian(times).tobytes())
+        f.write(_little_endian(offsets).tobytes())
+        f.writelines(records)
+    os.replace(tmp, path)
+    return len(items)
+
+
+class ChatArchive:
+    """Read-only view of a .wvca file; messages are decoded on access."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != ARCHIVE_MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a chat archive")
+        times_at = _HEADER.size
+        offsets_at = times_at + 8 * self.count
+        self._records_at = offsets_at + 8 * (self.count + 1)
+        view = memoryview(self._mm)
+        if sys.byteorder == "little":
+            self.times = view[times_at:offsets_at].cast("q")
+            self._offsets = view[offsets_at : self._records_at].cast("Q")
+        else:
+            self.times = _little_endian(array("q", bytes(view[times_at:offsets_at])))
+            self._offsets = _little_endian(array("Q", bytes(view[offsets_at : self._records_at])))
+        view.release()
+
+    def __enter__(self) -> "ChatArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        # Views into the map must be released before it can be closed.
+        for col in (self.times, self._offsets):
+            if isinstance(col, memoryview):
+                col.release()
+        self._mm.close()
+
+    def base_time(self) -> Optional[int]:
+        """Time of the earliest timestamped message."""
+        i = bisect_left(self.times, 0)
+        return self.times[i] if i < self.count else None
+
+    def index_range(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> range:
+        """Indices of messages with start_ms <= messageTime < end_ms (open ends when None)."""
+        lo = 0 if start_ms is None else bisect_left(self.times, start_ms)
+        hi = self.count if end_ms is None else bisect_left(self.times, end_ms)
+        return range(lo, max(lo, hi))
+
+    def message(self, i: int) -> dict:
+        a = self._records_at + self._offsets[i]
+        b = self._records_at + self._offsets[i + 1]
+        return loads_json(self._mm[a:b])
+
+    def slice(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> List[dict]:
+        return [self.message(i) for i in self.index_range(start_ms, end_ms)]
+
+
+def load_messages(path: str) -> Any:
+    """Whole chat from an archive, a JSON array or NDJSON."""
+    if is_archive(path):
+        with ChatArchive(path) as archive:
+            return archive.slice()
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Convert chat dumps to the indexed .wvca archive format.")
+    ap.add_argument("chat", help="Chat JSON/NDJSON to convert, or an archive with --info")
+    ap.add_argument("out", nargs="?", help="Output archive path (default: <chat stem>.wvca)")
+    ap.add_argument("--info", action="store_true", help="Print message count and time span of an archive")
+    args = ap.parse_args()
+
+    if args.info:
+        with ChatArchive(args.chat) as archive:
+            base = archive.base_time()
+            span = (archive.times[archive.count - 1] - base) / 1000.0 if base is not None else 0.0
+            print(f"{args.chat}: {len(archive)} messages, {span / 60:.1f} min of chat, first at {base}")
+        return 0
+
+    out = args.out or os.path.splitext(args.chat)[0] + ARCHIVE_EXT
+    data = load_messages(args.chat)
+    if not isinstance(data, list):
+        raise SystemExit("Chat JSON must be a list of messages.")
+    n = write_archive(out, [m for m in data if isinstance(m, dict)])
+    print(f"Wrote {n} messages to {out} ({os.path.getsize(out) / 1e6:.1f} MB, was {os.path.getsize(args.chat) / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+"""
+Decoding and JSON parsing for captured Weverse chat API response bodies.
+
+Kept free of Selenium imports so benchmarks and worker processes can use it directly.
+"""
+
+import gzip
+import json
+import threading
+import time
+import zlib
+
+try:
+    import brotli  # pip install brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # pip install zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson  # optional: faster JSON parsing
+except ImportError:
+    orjson = None
+
+
+# ZstdDecompressor instances are reusable but not thread-safe, so cache one per thread.
+_local = threading.local()
+
+
+def _zstd_decompress(body: bytes) -> bytes:
+    if zstandard is None:
+        raise RuntimeError("Response is zstd-encoded; install zstandard")
+    d = getattr(_local, "zstd", None)
+    if d is None:
+        d = _local.zstd = zstandard.ZstdDecompressor()
+    try:
+        return d.decompress(body)
+    except zstandard.ZstdError:
+        # Frames written without a content size need the streaming API.
+        return d.decompressobj().decompress(body)
+
+
+def _brotli_decompress(body: bytes) -> bytes:
+    if brotli is None:
+        raise RuntimeError("Response is brotli-encoded; install brotli")
+    return brotli.decompress(body)
+
+
+def _gzip_decompress(body: bytes) -> bytes:
+    return gzip.decompress(body)
+
+
+def _deflate_decompress(body: bytes) -> bytes:
+    try:
+        return zlib.decompress(body)
+    except zlib.error:
+        return zlib.decompress(body, -zlib.MAX_WBITS)
+
+
+DECODERS = {
+    "gzip": _gzip_decompress,
+    "x-gzip": _gzip_decompress,
+    "br": _brotli_decompress,
+    "zstd": _zstd_decompress,
+    "deflate": _deflate_decompress,
+}
+
+
+def decode_content(body: bytes, encoding: str) -> bytes:
+    """
+    Undo a Content-Encoding header value. Multiple codings ("gzip, br") were applied
+    in order, so they are removed in reverse. Unknown codings leave the body as-is.
+    """
+    if not encoding:
+        return body
+    for coding in reversed(encoding.lower().split(",")):
+        decoder = DECODERS.get(coding.strip())
+        if decoder is not None:
+            body = decoder(body)
+    return body
+
+
+def loads_json(raw: bytes):
+    """Parse JSON straight from bytes (orjson when installed), tolerating bad UTF-8."""
+    try:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+    except UnicodeDecodeError:
+        return json.loads(raw.decode("utf-8", errors="replace"))
+    except ValueError:
+        if orjson is None:
+            raise
+        # orjson rejects invalid UTF-8 outright; retry with replacement characters.
+        return json.loads(raw.decode("utf-8", errors="replace"))
+
+
+def parse_chat_body(body: bytes, encoding: str):
+    return loads_json(decode_content(body or b"", encoding or ""))
+
+
+def timed_parse_chat_messages(body: bytes, encoding: str):
+    """
+    Parse one captured page down to its message list, also returning (parse seconds,
+    decoded byte count) for metrics. Picklable entry point for worker pools.
+    """
+    t0 = time.perf_counter()
+    raw = decode_content(body or b"", encoding or "")
+    data = loads_json(raw).get("data") or []
+    return data, time.perf_counter() - t0, len(raw)
@@ -1,27 +1,30 @@
 import argparse
+import asyncio
+import base64
 import json
+import os
+import queue
+import re
 import time
-import gzip
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from seleniumwire import webdriver  # pip install selenium-wire
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 
-
-# ---------- cookie loader ----------
-def load_cookies_from_txt(driver, cookie_file):
-    with open(cookie_file, "r", encoding="utf-8") as f:
-        cookie_str = f.read().strip()
-
-    for cookie in cookie_str.split(";"):
-        cookie = cookie.strip()
-        if not cookie or "=" not in cookie:
-            continue
-        name, value = cookie.split("=", 1)
-        cookie_dict = {"name": name.strip(), "value": value.strip(), "domain": "weverse.io"}
-        try:
-            driver.add_cookie(cookie_dict)
-        except Exception:
-            pass
+from weverse_async import AsyncHTTP, run_async
+from weverse_browser import add_browser_args, apply_lite_options, block_heavy_resources
+from weverse_chat_archive import ARCHIVE_EXT, load_messages, write_archive
+from weverse_chat_decode import decode_content, loads_json, parse_chat_body, timed_parse_chat_messages
+from weverse_chat_index import DedupeIndex, message_key
+from weverse_chat_meta import find_start_time, write_chat_meta
+from weverse_chat_replay import save_fixture
+from weverse_metrics import METRICS, add_metrics_args, write_metrics
+from weverse_profile import add_profile_args, run_profiled
+from weverse_ratelimit import SCHEDULER, add_ratelimit_args, configure_scheduler
+from weverse_session import add_session_args, authenticate, check_cookie_file, use_user_data_dir
 
 
 # ---------- response body decode ----------
@@ -29,26 +32,10 @@ def decode_body(resp):
     body = resp.body or b""
     enc = ""
     try:
-        enc = (resp.headers.get("Content-Encoding") or "").lower()
+        enc = resp.headers.get("Content-Encoding") or ""
     except Exception:
         enc = ""
-
-    if not enc:
-        return body
-
-    if "gzip" in enc:
-        return gzip.decompress(body)
-
-    if "br" in enc:
-        import brotli
-        return brotli.decompress(body)
-
-    if "zstd" in enc:
-        import zstandard as zstd
-        d = zstd.ZstdDecompressor()
-        return d.decompress(body)
-
-    return body
+    return decode_content(body, enc)
 
 
 # ---------- identify chat requests ----------
@@ -60,9 +47,27 @@ def is_chat_messages_request(req) -> bool:
 
 
 def parse_chat_payload(req):
-    raw = decode_body(req.response)
-    txt = raw.decode("utf-8", errors="replace")
-    return json.loads(txt)
+    return loads_json(decode_body(req.response))
+
+
+def is_post_request(req) -> bool:
+    if not req.response:
+        return False
+    return "/post/v1.0/post-" in (req.url or "")
+
+
+def find_live_start(driver):
+    """(epoch ms, source) of the live's start from the post API responses the page made, or (None, None)."""
+    for req in driver.requests:
+        if not is_post_request(req):
+            continue
+        try:
+            found = find_start_time(loads_json(decode_body(req.response)))
+        except Exception:
+            continue
+        if found:
+            return found[0], f"api:{found[1]}"
+    return None, None
 
 
 # ---------- seek to end + scroll previous chat panel ----------
@@ -324,7 +329,7 @@ def wait_for_new_chat_request(driver, prev_count: int, timeout_sec: float = 6.0)
     return False
 
 
-def dump_chat(cookie_file: str, target_url: str, out_file: str, headless: bool = True):
+def build_driver(headless: bool = True, user_data_dir: str = None, lite: bool = False, frame_log: bool = False):
     options = Options()
     if headless:
         options.add_argument("--headless=new")
@@ -335,74 +340,344 @@ def dump_chat(cookie_file: str, target_url: str, out_file: str, headless: bool =
         "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36"
     )
 
-    sw_opts = {"verify_ssl": False, "disable_encoding": False}
-    driver = webdriver.Chrome(options=options, seleniumwire_options=sw_opts)
-
-    try:
-        driver.get("https://weverse.io/")
-        load_cookies_from_txt(driver, cookie_file)
-        driver.refresh()
-
-        driver.requests.clear()
-        driver.get(target_url)
+    use_user_data_dir(options, user_data_dir)
+    if lite:
+        apply_lite_options(options)
+    if frame_log:
+        # CDP Network events (incl. websocket frames) become readable via driver.get_log("performance").
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
-        # Wait for first chat response
-        print("Waiting for first chat API response...")
+    sw_opts = {"verify_ssl": False, "disable_encoding": False}
+    with METRICS.stage("browser_startup"):
+        driver = webdriver.Chrome(options=options, seleniumwire_options=sw_opts)
+        if lite:
+            block_heavy_resources(driver)
+        return driver
+
+
+def open_chat_page(
+    driver, cookie_file: str, target_url: str, user_data_dir: str = None, require_chat: bool = True
+) -> None:
+    with METRICS.stage("cookie_bootstrap"):
+        authenticate(driver, cookie_file, user_data_dir)
+
+    driver.requests.clear()
+    with METRICS.stage("page_load"):
+        SCHEDULER.call(target_url, lambda: driver.get(target_url), retry_on=(WebDriverException,))
+
+    # Wait for first chat response
+    print("Waiting for first chat API response...")
+    with METRICS.stage("first_chat_wait"):
         t0 = time.time()
         while time.time() - t0 < 30:
             if any(is_chat_messages_request(r) for r in driver.requests):
                 break
             time.sleep(0.5)
 
-        if not any(is_chat_messages_request(r) for r in driver.requests):
+    if not any(is_chat_messages_request(r) for r in driver.requests):
+        if not require_chat:
+            # A live may push all of its chat over the websocket.
+            print("No chat messages API response yet; waiting for chat on the websocket.")
+        else:
             raise RuntimeError(
                 "Did not see any chat messages API responses.\n"
                 "Try running with --no-headless and confirm the replay chat is visible."
             )
 
-        try:
-            driver.execute_script(DISABLE_AUTOPLAY_JS)
-        except Exception as e:
-            print(f"Autoplay toggle script error: {e}")
+    try:
+        driver.execute_script(DISABLE_AUTOPLAY_JS)
+    except Exception as e:
+        print(f"Autoplay toggle script error: {e}")
+
+
+# ---------- concurrent history paging by time windows ----------
+VIDEO_DURATION_JS = r"""
+const v = document.querySelector("video");
+return v && isFinite(v.duration) ? v.duration : null;
+"""
+
+
+# Replay chat is loaded around the playback position, so the newest page only shows up
+# once the player sits at the end.
+SEEK_TO_END_JS = r"""
+const v = document.querySelector("video");
+if (!v || !isFinite(v.duration) || v.duration <= 0) return null;
+v.pause();
+v.currentTime = Math.max(0, v.duration - 1);
+v.pause();
+return v.duration;
+"""
+
+# Windows must reach this close (in ms, or this share of the VOD) to both ends of the chat.
+WINDOW_COVERAGE_SLACK_MS = 300_000
+WINDOW_COVERAGE_SLACK_SHARE = 0.1
+
 
-        seen_req_urls = set()
-        seen_msgs = set()
-        all_msgs = []
+def page_times(req) -> list:
+    return [m.get("messageTime") for m in parse_chat_payload(req).get("data") or [] if m.get("messageTime") is not None]
 
-        idle_rounds = 0
-        max_idle_rounds = 5  # allow more attempts
 
-        print("Scrolling to load older chat pages...")
+def find_chat_end(driver, duration: float, request_timeout: float = 10.0):
+    """
+    (end_ms, source) of the VOD's chat: the newest message after seeking the player to
+    the end, else the live start from the post API plus the duration; (None, None) if neither.
+    """
+    prev_count = sum(1 for r in driver.requests if is_chat_messages_request(r))
+    try:
+        driver.execute_script(SEEK_TO_END_JS)
+    except Exception as e:
+        print(f"Seek to end failed ({e})")
+    if wait_for_new_chat_request(driver, prev_count, timeout_sec=request_timeout):
+        newest = []
+        for r in [r for r in driver.requests if is_chat_messages_request(r)][prev_count:]:
+            try:
+                newest.extend(page_times(r))
+            except Exception:
+                continue
+        if newest:
+            return max(newest) + 1, "newest chat page"
+
+    live_start, _ = find_live_start(driver)
+    if live_start:
+        return live_start + int(duration * 1000), "live start + duration"
+    return None, None
+
+
+def with_query_param(url: str, name: str, value) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != name]
+    query.append((name, str(value)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def fetch_chat_page(http: AsyncHTTP, url: str, headers: dict) -> dict:
+    body, enc = await SCHEDULER.call_async(url, lambda: http.get(url, headers))
+    return parse_chat_body(body, enc)
+
+
+async def fetch_window(
+    http: AsyncHTTP,
+    template_url: str,
+    headers: dict,
+    cursor_param: str,
+    lo_ms: int,
+    hi_ms: int,
+    max_pages: int = 10000,
+) -> tuple:
+    """
+    Pages backwards from hi_ms until the window's lower bound (or the chat start) is reached.
+    Returns (messages, reached_ms): the window is complete when reached_ms <= lo_ms, or
+    when paging ran out of messages and no older window found any.
+    """
+    msgs = []
+    cursor = hi_ms
+    for _ in range(max_pages):
+        payload = await fetch_chat_page(http, with_query_param(template_url, cursor_param, cursor), headers)
+        data = payload.get("data") or []
+        times = [m.get("messageTime") for m in data if m.get("messageTime") is not None]
+        if not times:
+            return msgs, cursor  # nothing older than the cursor
+        msgs.extend(m for m in data if lo_ms <= (m.get("messageTime") or 0) < hi_ms)
+        oldest = min(times)
+        if oldest <= lo_ms:
+            return msgs, oldest
+        if oldest >= cursor:
+            break  # cursor ignored
+        # The API returns messages strictly older than the cursor, so page again from
+        # oldest + 1: other messages in that millisecond may not have fit on this page.
+        # The repeats are dropped by the DedupeIndex. A page that is all one millisecond
+        # has to step past it.
+        cursor = oldest + 1 if oldest + 1 < cursor else oldest
+    return msgs, cursor
+
+
+async def probe_cursor(template_url: str, headers: dict, cursor_param: str, cursor: int) -> bool:
+    """The API must only return messages older than the cursor we send."""
+    async with AsyncHTTP(concurrency=1) as http:
+        probe = await fetch_chat_page(http, with_query_param(template_url, cursor_param, cursor), headers)
+    return not any((m.get("messageTime") or 0) >= cursor for m in probe.get("data") or [])
+
+
+async def fetch_windows(template_url: str, headers: dict, cursor_param: str, bounds: list, concurrency: int) -> list:
+    """Pages all windows on one event loop; returns (lo_ms, messages, reached_ms) per window in completion order."""
+
+    async def fetch(lo: int, hi: int) -> tuple:
+        msgs, reached = await fetch_window(http, template_url, headers, cursor_param, lo, hi)
+        return lo, msgs, reached
+
+    async with AsyncHTTP(concurrency) as http:
+        tasks = [fetch(lo, hi) for lo, hi in bounds]
+        results = []
+        for fut in asyncio.as_completed(tasks):
+            results.append(await fut)
+            print(f"window {len(results)}/{len(bounds)} done")
+        return results
+
+
+def harvest_by_windows(driver, windows: int, workers: int, cursor_param: str, seen_msgs: DedupeIndex):
+    """
+    Splits the VOD's chat span into `windows` time ranges and pages them concurrently
+    by replaying the captured chat request with a cursor query parameter. All windows
+    share one asyncio event loop with at most `workers` requests in flight.
+    Returns None when the API does not honour the cursor or the windows miss part of the
+    chat, so callers can fall back to scrolling.
+    """
+    first = next((r for r in driver.requests if is_chat_messages_request(r)), None)
+    try:
+        duration = driver.execute_script(VIDEO_DURATION_JS)
+    except Exception as e:
+        print(f"Windowed paging unavailable ({e}); falling back to scrolling.")
+        return None
+    if first is None or not duration:
+        print("Windowed paging needs a chat page and a video duration; falling back to scrolling.")
+        return None
+
+    # The first page is chat around the playback start, not the end of the VOD.
+    end_ms, source = find_chat_end(driver, duration)
+    if end_ms is None:
+        print("Could not find where the chat ends; falling back to scrolling.")
+        return None
+    print(f"Chat end from {source}")
+
+    headers = {k: v for k, v in first.headers.items() if k.lower() not in ("host", "content-length")}
+    start_ms = end_ms - int(duration * 1000)
+
+    try:
+        honoured = run_async(probe_cursor(first.url, headers, cursor_param, (start_ms + end_ms) // 2))
+    except Exception as e:
+        print(f"Windowed paging probe failed ({e}); falling back to scrolling.")
+        return None
+    if not honoured:
+        print(f"Chat API ignores '{cursor_param}'; falling back to scrolling.")
+        return None
+
+    step = (end_ms - start_ms) / windows
+    bounds = [(int(start_ms + i * step), int(start_ms + (i + 1) * step)) for i in range(windows)]
+    bounds[0] = (0, bounds[0][1])  # oldest window runs to the start of the chat
+    bounds[-1] = (bounds[-1][0], end_ms)
+
+    print(f"Fetching {windows} time windows, up to {workers} requests in flight...")
+    try:
+        with METRICS.stage("window_paging"):
+            results = run_async(fetch_windows(first.url, headers, cursor_param, bounds, workers))
+    except Exception as e:
+        print(f"Window fetch failed ({e}); falling back to scrolling.")
+        return None
+
+    # Checked before anything reaches seen_msgs, so a fallback still records every message.
+    # Each window must page down to where the next older one ends, else there is a hole.
+    # An empty page is only the chat start if no older window found messages either.
+    oldest_lo = min((lo for lo, window_msgs, _ in results if window_msgs), default=None)
+    holes = [lo for lo, _, reached in results if reached > lo and oldest_lo is not None and oldest_lo < lo]
+    if holes:
+        print(f"{len(holes)} windows stopped before reaching the previous one; falling back to scrolling.")
+        return None
+    times = [m.get("messageTime") for _, window_msgs, _ in results for m in window_msgs if m.get("messageTime") is not None]
+    slack = max(WINDOW_COVERAGE_SLACK_MS, int(duration * 1000 * WINDOW_COVERAGE_SLACK_SHARE))
+    if not times or min(times) > start_ms + slack or max(times) < end_ms - slack:
+        print("Windows do not cover the whole chat; falling back to scrolling.")
+        return None
+
+    all_msgs = []
+    for _, window_msgs, _ in results:
+        for m in window_msgs:
+            if seen_msgs.add_message(m):
+                all_msgs.append(m)
+                METRICS.incr("messages")
+    print(f"windows done total_msgs={len(all_msgs)}")
+    return all_msgs
+
+
+class ParseStage:
+    """
+    Decompresses and parses captured chat bodies on a worker pool so the Selenium
+    thread can keep triggering scrolls. workers=0 parses inline on the caller's thread.
+    """
+
+    def __init__(self, workers: int = 2, processes: bool = False):
+        self.pool = None
+        if workers > 0:
+            pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+            self.pool = pool_cls(max_workers=workers)
+        self.pending = deque()
+
+    def submit(self, body: bytes, encoding: str) -> None:
+        if self.pool is None:
+            fut = Future()
+            try:
+                fut.set_result(timed_parse_chat_messages(body, encoding))
+            except Exception as e:
+                fut.set_exception(e)
+        else:
+            fut = self.pool.submit(timed_parse_chat_messages, body, encoding)
+        self.pending.append(fut)
+        METRICS.incr("bytes_captured", len(body))
+
+    def drain(self, block: bool = False) -> list:
+        """Return message lists of finished pages (in capture order); with block=True wait for all."""
+        pages = []
+        while self.pending and (block or self.pending[0].done()):
+            fut = self.pending.popleft()
+            try:
+                data, seconds, decoded = fut.result()
+            except Exception as e:
+                METRICS.incr("parse_errors")
+                print(f"Failed to parse one response: {e}")
+                continue
+            METRICS.observe("page_parse", seconds)
+            METRICS.incr("pages")
+            METRICS.incr("bytes_decoded", decoded)
+            pages.append(data)
+        return pages
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+
+def harvest_by_scrolling(
+    driver,
+    seen_msgs: DedupeIndex,
+    parse_workers: int = 2,
+    parse_processes: bool = False,
+    max_idle_rounds: int = 5,
+    request_timeout: float = 6.0,
+    idle_pause: float = 1.0,
+) -> list:
+    seen_req_urls = DedupeIndex()
+    all_msgs = []
+
+    idle_rounds = 0
+
+    stage = ParseStage(parse_workers, parse_processes)
+
+    def merge(pages) -> int:
+        new_pages = 0
+        for data in pages:
+            if not data:
+                continue
+            new_pages += 1
+            for m in data:
+                if seen_msgs.add_message(m):
+                    all_msgs.append(m)
+                    METRICS.incr("messages")
+        return new_pages
+
+    print("Scrolling to load older chat pages...")
+    try:
         while True:
-            # 1) harvest any new chat pages we captured since last loop
-            new_pages = 0
+            # 1) hand any new chat pages we captured since last loop to the parse stage
             for req in driver.requests:
                 if not is_chat_messages_request(req):
                     continue
-                if req.url in seen_req_urls:
-                    continue
-                seen_req_urls.add(req.url)
-
-                try:
-                    payload = parse_chat_payload(req)
-                except Exception as e:
-                    print(f"Failed to parse one response: {e}")
-                    continue
-
-                data = payload.get("data") or []
-                if not data:
+                if not seen_req_urls.add_url(req.url):
                     continue
+                stage.submit(req.response.body or b"", req.response.headers.get("Content-Encoding") or "")
 
-                new_pages += 1
-                for m in data:
-                    key = (m.get("messageTime"), m.get("userId"), m.get("content"))
-                    if key in seen_msgs:
-                        continue
-                    seen_msgs.add(key)
-                    all_msgs.append(m)
+            new_pages = merge(stage.drain())
 
-            # 2) decide whether we’re still making progress
-            if new_pages == 0:
+            # 2) decide whether we’re still making progress (pages still parsing count as progress)
+            if new_pages == 0 and not stage.pending:
                 idle_rounds += 1
             else:
                 idle_rounds = 0
@@ -414,6 +689,7 @@ def dump_chat(cookie_file: str, target_url: str, out_file: str, headless: bool =
                 break
 
             # 3) trigger loading older messages by scrolling the previous chat panel
+            round_t0 = time.perf_counter()
             prev_count = chat_req_count
             try:
                 result = driver.execute_async_script(SCROLL_PREVIOUS_CHAT_JS)
@@ -423,31 +699,331 @@ def dump_chat(cookie_file: str, target_url: str, out_file: str, headless: bool =
                 print(f"Scroll script error: {e}")
 
             # wait for a new network call
-            got_new = wait_for_new_chat_request(driver, prev_count, timeout_sec=6.0)
+            got_new = wait_for_new_chat_request(driver, prev_count, timeout_sec=request_timeout)
 
             if not got_new:
                 # If scrolling didn’t trigger, try a longer pause; some pages debounce loads
-                time.sleep(1.0)
+                time.sleep(idle_pause)
+            METRICS.observe("scroll_round", time.perf_counter() - round_t0)
+
+        # pick up pages still being parsed when the loop stopped
+        merge(stage.drain(block=True))
+    finally:
+        stage.close()
+
+    return all_msgs
+
+
+def save_chat_meta(driver, out_file: str, target_url: str, msgs=None) -> None:
+    live_start, source = find_live_start(driver)
+    meta = {"url": target_url, "liveStartTime": live_start, "liveStartSource": source}
+    if msgs:
+        meta["firstMessageTime"] = msgs[0].get("messageTime")
+        meta["messages"] = len(msgs)
+    path = write_chat_meta(out_file, meta)
+    if live_start:
+        print(f"Live start time {live_start} ({source}) saved to {path}")
+    else:
+        print(f"Live start time not found; {path} has no liveStartTime (use --live-start when rendering)")
+
+
+def merge_with_previous_dump(out_file: str, new_msgs: list) -> list:
+    """
+    A run resumed from --dedupe-index only harvests messages the index has not seen,
+    so the earlier dump at out_file is kept and the new messages are added to it.
+    """
+    if not os.path.exists(out_file):
+        return new_msgs
+    previous = [m for m in load_messages(out_file) if isinstance(m, dict)]
+    known = {message_key(m) for m in previous}
+    merged = previous + [m for m in new_msgs if message_key(m) not in known]
+    print(f"Merged {len(merged) - len(previous)} new messages into {len(previous)} from {out_file}")
+    return merged
+
+
+def dump_chat(
+    cookie_file: str,
+    target_url: str,
+    out_file: str,
+    headless: bool = True,
+    windows: int = 0,
+    workers: int = 4,
+    cursor_param: str = "before",
+    parse_workers: int = 2,
+    parse_processes: bool = False,
+    dedupe_index: str = None,
+    record_fixture: str = None,
+    user_data_dir: str = None,
+    lite: bool = False,
+):
+    seen_msgs = DedupeIndex(dedupe_index)
+    if len(seen_msgs):
+        print(f"Loaded {len(seen_msgs)} known message keys from {dedupe_index}")
+
+    driver = build_driver(headless, user_data_dir, lite)
+
+    try:
+        open_chat_page(driver, cookie_file, target_url, user_data_dir)
+
+        all_msgs = None
+        if windows > 1:
+            all_msgs = harvest_by_windows(driver, windows, workers, cursor_param, seen_msgs)
+        if all_msgs is None:
+            all_msgs = harvest_by_scrolling(driver, seen_msgs, parse_workers, parse_processes)
+
+        if dedupe_index:
+            all_msgs = merge_with_previous_dump(out_file, all_msgs)
 
         # sort old -> new
         all_msgs.sort(key=lambda m: m.get("messageTime", 0))
-        with open(out_file, "w", encoding="utf-8") as f:
-            json.dump(all_msgs, f, ensure_ascii=False, indent=2)
+        with METRICS.stage("output_write"):
+            if out_file.lower().endswith(ARCHIVE_EXT):
+                write_archive(out_file, all_msgs)
+            else:
+                # Written aside and swapped in, so an interrupted run never leaves a partial dump.
+                tmp = out_file + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(all_msgs, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, out_file)
 
         print(f"Saved {len(all_msgs)} messages to {out_file}")
+        seen_msgs.save()
+        save_chat_meta(driver, out_file, target_url, all_msgs)
+
+        if record_fixture:
+            pages = [
+                (r.url, r.response.headers.get("Content-Encoding") or "", r.response.body or b"")
+                for r in driver.requests
+                if is_chat_messages_request(r)
+            ]
+            save_fixture(record_fixture, pages)
+            print(f"Recorded {len(pages)} chat pages to {record_fixture}")
 
     finally:
         driver.quit()
 
+
+# ---------- live capture ----------
+class RecentKeys:
+    """Bounded dedupe set: remembers only the most recent `maxlen` keys."""
+
+    def __init__(self, maxlen: int = 50000):
+        self.maxlen = maxlen
+        self._order = deque()
+        self._keys = set()
+
+    def add(self, key) -> bool:
+        """Return True if key is new (and remember it), False if already seen."""
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._order.append(key)
+        if len(self._order) > self.maxlen:
+            self._keys.discard(self._order.popleft())
+        return True
+
+
+class MessageRate:
+    """Sliding-window message rate for live stats output."""
+
+    def __init__(self, window_sec: float = 60.0):
+        self.window_sec = window_sec
+        self._times = deque()
+
+    def add(self, n: int, now: float) -> None:
+        for _ in range(n):
+            self._times.append(now)
+        self._trim(now)
+
+    def per_minute(self, now: float) -> float:
+        self._trim(now)
+        return len(self._times) * 60.0 / self.window_sec
+
+    def _trim(self, now: float) -> None:
+        while self._times and now - self._times[0] > self.window_sec:
+            self._times.popleft()
+
+
+# socket.io/engine.io packet type digits in front of the JSON.
+WS_PACKET_PREFIX_RE = re.compile(r"^\d+")
+
+
+def drain_ws_frames(driver) -> list:
+    """Text of the websocket frames received since the last call, from Chrome's performance log."""
+    frames = []
+    for entry in driver.get_log("performance"):
+        try:
+            event = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if event.get("method") != "Network.webSocketFrameReceived":
+            continue
+        resp = (event.get("params") or {}).get("response") or {}
+        data = resp.get("payloadData") or ""
+        if resp.get("opcode") == 2:  # binary frames arrive base64-encoded
+            try:
+                data = base64.b64decode(data).decode("utf-8", errors="replace")
+            except ValueError:
+                continue
+        frames.append(data)
+    return frames
+
+
+def ws_frame_messages(payload: str) -> list:
+    """Chat messages (objects with a messageTime) anywhere in one websocket frame."""
+    text = WS_PACKET_PREFIX_RE.sub("", payload.strip(), count=1)
+    if "\n\n" in text and not text.startswith(("{", "[")):
+        text = text.split("\n\n", 1)[1]  # STOMP: headers, blank line, body
+    try:
+        obj = loads_json(text.rstrip("\x00").encode("utf-8"))
+    except ValueError:
+        return []
+
+    found = []
+
+    def walk(o) -> None:
+        if isinstance(o, dict):
+            if o.get("messageTime") is not None:
+                found.append(o)
+                return
+            for v in o.values():
+                walk(v)
+        elif isinstance(o, list):
+            for v in o:
+                walk(v)
+
+    walk(obj)
+    return found
+
+
+def capture_live_chat(
+    cookie_file: str,
+    target_url: str,
+    out_file: str,
+    headless: bool = True,
+    duration: float = 0.0,
+    stats_every: float = 10.0,
+    dedupe_window: int = 50000,
+    user_data_dir: str = None,
+    lite: bool = False,
+):
+    """
+    Streams chat of an in-progress live to NDJSON (one message per line).
+
+    Chat poll responses are handed over by selenium-wire's response interceptor
+    as they arrive, and chat pushed over a websocket is read from the frames in
+    Chrome's performance log, so nothing waits on scrolling. Captured request
+    storage and the log are cleared after every poll and dedupe only remembers
+    the last `dedupe_window` keys, keeping memory flat for multi-hour sessions.
+    """
+    pages = queue.Queue()
+
+    def on_response(req, resp):
+        url = req.url or ""
+        if "/weverse/wevweb/chat/v1.0/chat-" in url and "/messages" in url:
+            pages.put((url, resp.body or b"", resp.headers.get("Content-Encoding") or ""))
+
+    driver = build_driver(headless, user_data_dir, lite, frame_log=True)
+    driver.scopes = [r".*/weverse/wevweb/chat/v1\.0/chat-.*", r".*/post/v1\.0/post-.*"]
+    driver.response_interceptor = on_response
+
+    recent = RecentKeys(dedupe_window)
+    rate = MessageRate()
+    total = 0
+    t_start = time.time()
+    last_stats = t_start
+    read_frames = True
+
+    try:
+        open_chat_page(driver, cookie_file, target_url, user_data_dir, require_chat=False)
+        save_chat_meta(driver, out_file, target_url)
+        print(f"Capturing live chat to {out_file} (Ctrl+C to stop)...")
+
+        with open(out_file, "a", encoding="utf-8") as f:
+            while True:
+                batches = []
+                while True:
+                    try:
+                        url, body, enc = pages.get_nowait()
+                    except queue.Empty:
+                        break
+                    try:
+                        payload = parse_chat_body(body, enc)
+                    except Exception as e:
+                        print(f"Failed to parse one response: {e}")
+                        continue
+                    batches.append(payload.get("data") or [])
+
+                if read_frames:
+                    try:
+                        frames = drain_ws_frames(driver)
+                    except WebDriverException as e:
+                        print(f"Websocket frames unavailable ({e}); capturing chat polls only.")
+                        read_frames = False
+                        frames = []
+                    METRICS.incr("ws_frames", len(frames))
+                    batches.extend(ws_frame_messages(frame) for frame in frames)
+
+                written = 0
+                for batch in batches:
+                    for m in batch:
+                        if not recent.add(message_key(m)):
+                            continue
+                        f.write(json.dumps(m, ensure_ascii=False) + "\n")
+                        written += 1
+
+                now = time.time()
+                if written:
+                    f.flush()
+                    total += written
+                    METRICS.incr("messages", written)
+                    rate.add(written, now)
+
+                # Bodies were already handed to us by the interceptor.
+                del driver.requests
+
+                if now - last_stats >= stats_every:
+                    last_stats = now
+                    print(
+                        f"live total_msgs={total} rate={rate.per_minute(now):.1f}/min "
+                        f"elapsed={now - t_start:.0f}s backlog={pages.qsize()}"
+                    )
+
+                if duration and now - t_start >= duration:
+                    break
+                time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("Stopping live capture.")
+    finally:
+        driver.quit()
+
+    print(f"Appended {total} messages to {out_file}")
+
+
 def parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser()
     ap.add_argument("--cookies", help="Path to cookies.txt")
     ap.add_argument("--url", help="Weverse live/VOD URL")
-    ap.add_argument("--out", help="Output JSON path")
+    ap.add_argument("--out", help="Output JSON path (.wvca writes an indexed chat archive, see weverse_chat_archive.py)")
     ap.add_argument("cookie_file", nargs="?", help="Cookies txt path (positional fallback)")
     ap.add_argument("target_url", nargs="?", help="Weverse live/VOD URL (positional fallback)")
     ap.add_argument("out_file", nargs="?", help="Output JSON path (positional fallback)")
     ap.add_argument("--no-headless", dest="headless", action="store_false", help="Show browser window")
+    ap.add_argument("--windows", type=int, default=0, help="Split the VOD into N time windows fetched in parallel (falls back to scrolling)")
+    ap.add_argument("--workers", type=int, default=4, help="Concurrent chat API requests for --windows (asyncio; dozens are fine)")
+    ap.add_argument("--cursor-param", default="before", help="Chat API query parameter taking a messageTime upper bound")
+    ap.add_argument("--parse-workers", type=int, default=2, help="Workers parsing chat pages off the browser thread (0 = inline)")
+    ap.add_argument("--parse-processes", action="store_true", help="Use a process pool instead of threads for page parsing")
+    ap.add_argument("--dedupe-index", help="Persistent dedupe index; messages already recorded there are skipped and new ones added")
+    ap.add_argument("--record-fixture", help="Save captured chat pages as a replay fixture (see bench_chat_dump.py)")
+    ap.add_argument("--live", action="store_true", help="Stream an in-progress live's chat to NDJSON (appends to --out)")
+    ap.add_argument("--duration", type=float, default=0.0, help="Live mode: stop after N seconds (0 = until Ctrl+C)")
+    ap.add_argument("--stats-every", type=float, default=10.0, help="Live mode: seconds between rate stats lines")
+    add_session_args(ap)
+    add_browser_args(ap)
+    add_ratelimit_args(ap)
+    add_metrics_args(ap)
+    add_profile_args(ap)
     ap.set_defaults(headless=True)
 
     args = ap.parse_args()
@@ -457,13 +1033,51 @@ def parse_args() -> argparse.Namespace:
 
     if not args.cookie_file or not args.target_url or not args.out_file:
         ap.error("Missing required inputs. Provide --cookies, --url, --out (or positional equivalents).")
+    if args.live and args.out_file.lower().endswith(ARCHIVE_EXT):
+        ap.error("--live appends NDJSON; convert it afterwards with weverse_chat_archive.py.")
 
     return args
 
 
+def run(args: argparse.Namespace) -> None:
+    check_cookie_file(args.cookie_file)
+    configure_scheduler(args)
+    if args.live:
+        capture_live_chat(
+            args.cookie_file,
+            args.target_url,
+            args.out_file,
+            headless=args.headless,
+            duration=args.duration,
+            stats_every=args.stats_every,
+            user_data_dir=args.user_data_dir,
+            lite=args.lite,
+        )
+    else:
+        dump_chat(
+            args.cookie_file,
+            args.target_url,
+            args.out_file,
+            headless=args.headless,
+            windows=args.windows,
+            workers=args.workers,
+            cursor_param=args.cursor_param,
+            parse_workers=args.parse_workers,
+            parse_processes=args.parse_processes,
+            dedupe_index=args.dedupe_index,
+            record_fixture=args.record_fixture,
+            user_data_dir=args.user_data_dir,
+            lite=args.lite,
+        )
+
+
 def main() -> int:
     args = parse_args()
-    dump_chat(args.cookie_file, args.target_url, args.out_file, headless=args.headless)
+    METRICS.script = "weverse_chat_dump"
+    try:
+        run_profiled(lambda: run(args), args, METRICS.script)
+    finally:
+        write_metrics(args.metrics, args.metrics_format)
     return 0
 
 
@@ -0,0 +1,96 @@
+"""
+Compact dedupe index for chat messages and captured page URLs.
+
+Keys are stored as packed 64-bit integers instead of full (messageTime, userId, content)
+tuples: the message id when the payload carries one, otherwise a blake2b digest
+of the tuple. The index can be saved to / loaded from a flat binary file so a
+resumed or later run skips messages an earlier run already wrote.
+"""
+
+import os
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+from typing import Iterable, Optional
+
+MESSAGE_ID_FIELDS = ("messageId", "id")
+
+
+def hash64(text: str) -> int:
+    return int.from_bytes(blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def message_key(m: dict) -> int:
+    for name in MESSAGE_ID_FIELDS:
+        mid = m.get(name)
+        if mid is not None and mid != "":
+            return hash64(f"id\x00{mid}")
+    return hash64(f"{m.get('messageTime')}\x00{m.get('userId')}\x00{m.get('content')}")
+
+
+class DedupeIndex:
+    """
+    64-bit key set with optional persistence to `path`.
+
+    Keys live in a sorted array("Q") (8 bytes each) searched with bisect; new keys
+    collect in a small set that is merged into the array once it grows past
+    `buffer_size`, so memory stays close to the raw key size.
+    """
+
+    def __init__(self, path: Optional[str] = None, buffer_size: int = 65536):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._sorted = array("Q")
+        self._recent = set()
+        if path and os.path.exists(path):
+            self._sorted = array("Q", sorted(set(self._read(path))))
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, key: int) -> bool:
+        if key in self._recent:
+            return True
+        i = bisect_left(self._sorted, key)
+        return i < len(self._sorted) and self._sorted[i] == key
+
+    def add(self, key: int) -> bool:
+        """Return True if key is new (and remember it), False if already seen."""
+        if key in self:
+            return False
+        self._recent.add(key)
+        if len(self._recent) >= self.buffer_size:
+            self._merge()
+        return True
+
+    def add_message(self, m: dict) -> bool:
+        return self.add(message_key(m))
+
+    def add_url(self, url: str) -> bool:
+        return self.add(hash64(f"url\x00{url}"))
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            return
+        self._merge()
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            self._sorted.tofile(f)
+        os.replace(tmp, path)
+
+    def _merge(self) -> None:
+        if not self._recent:
+            return
+        merged = array("Q", sorted(self._recent))
+        merged.extend(self._sorted)
+        self._sorted = array("Q", sorted(merged))
+        self._recent = set()
+
+    @staticmethod
+    def _read(path: str) -> Iterable[int]:
+        keys = array("Q")
+        with open(path, "rb") as f:
+            data = f.read()
+        keys.frombytes(data[: len(data) - len(data) % keys.itemsize])
+        return keys
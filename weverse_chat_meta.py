@@ -0,0 +1,74 @@
+"""
+Sidecar metadata for chat dumps: <chat stem>.meta.json next to the chat file.
+
+    {"url": "...", "liveStartTime": 1731090120000, "liveStartSource": "api:onAirStartAt",
+     "firstMessageTime": 1731089950123, "messages": 48211}
+
+weverse_chat_dump writes it; weverse_chat_to_ass_twitch --auto-offset reads
+liveStartTime to line the chat up with the video without a manual offset.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+# Most specific first: when the broadcast actually went on air, then when the post went up.
+START_TIME_KEYS = ("onAirStartAt", "liveStartAt", "startAt", "publishedAt", "publishAt")
+
+
+def chat_meta_path(chat_path: str) -> str:
+    return os.path.splitext(chat_path)[0] + ".meta.json"
+
+
+def read_chat_meta(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_chat_meta(chat_path: str, meta: dict) -> str:
+    path = chat_meta_path(chat_path)
+    existing = read_chat_meta(path) or {}
+    existing.update({k: v for k, v in meta.items() if v is not None})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(existing, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def to_epoch_ms(value: Any) -> Optional[int]:
+    """Epoch seconds/milliseconds as number or digits, or an ISO 8601 string (naive = local time)."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.strip().isdigit()):
+        n = float(value)
+        return int(n if n > 1e11 else n * 1000)
+    try:
+        dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return int(dt.timestamp() * 1000)
+
+
+def find_start_time(obj: Any) -> Optional[Tuple[int, str]]:
+    """Best live start time (epoch ms, key) anywhere in a post API response."""
+    found = {}
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            for k, v in node.items():
+                if k in START_TIME_KEYS and k not in found:
+                    ms = to_epoch_ms(v)
+                    if ms:
+                        found[k] = ms
+                walk(v)
+        elif isinstance(node, list):
+            for v in node:
+                walk(v)
+
+    walk(obj)
+    for key in START_TIME_KEYS:
+        if key in found:
+            return found[key], key
+    return None
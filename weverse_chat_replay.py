@@ -0,0 +1,114 @@
+"""
+Recorded chat traffic fixtures and an offline stand-in for the selenium-wire driver.
+
+Fixture format: NDJSON, one captured /messages response per line, oldest request first:
+
+    {"url": "...", "encoding": "gzip", "body": "<base64 of the raw response body>"}
+
+ReplayDriver serves those pages to weverse_chat_dump's harvest loop the way a real
+browser would: one page is visible after loading and each scroll script call
+"captures" the next one.
+"""
+
+import base64
+import gzip
+import json
+from typing import List, Tuple
+
+from weverse_chat_decode import brotli, zstandard
+
+CHAT_URL_TEMPLATE = "https://global.apis.naver.com/weverse/wevweb/chat/v1.0/chat-replay/messages?page={page}"
+
+
+def save_fixture(path: str, pages: List[Tuple[str, str, bytes]]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for url, encoding, body in pages:
+            rec = {"url": url, "encoding": encoding, "body": base64.b64encode(body).decode("ascii")}
+            f.write(json.dumps(rec) + "\n")
+
+
+def load_fixture(path: str) -> List[Tuple[str, str, bytes]]:
+    pages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            pages.append((rec["url"], rec.get("encoding") or "", base64.b64decode(rec["body"])))
+    return pages
+
+
+def encode_body(raw: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(raw)
+    if encoding == "br":
+        if brotli is None:
+            raise RuntimeError("brotli is not installed")
+        return brotli.compress(raw)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return zstandard.ZstdCompressor().compress(raw)
+    return raw
+
+
+def fixture_from_chat(msgs: list, page_size: int = 50, encoding: str = "gzip") -> List[Tuple[str, str, bytes]]:
+    """Build fixture pages from a chat dump, newest page first like the replay chat panel requests them."""
+    msgs = sorted(msgs, key=lambda m: m.get("messageTime", 0), reverse=True)
+    pages = []
+    for n, i in enumerate(range(0, len(msgs), page_size)):
+        raw = json.dumps({"data": msgs[i : i + page_size]}, ensure_ascii=False).encode("utf-8")
+        pages.append((CHAT_URL_TEMPLATE.format(page=n), encoding, encode_body(raw, encoding)))
+    return pages
+
+
+class _ReplayResponse:
+    def __init__(self, body: bytes, encoding: str):
+        self.body = body
+        self.headers = {"Content-Encoding": encoding} if encoding else {}
+
+
+class _ReplayRequest:
+    def __init__(self, url: str, body: bytes, encoding: str):
+        self.url = url
+        self.response = _ReplayResponse(body, encoding)
+
+
+class ReplayDriver:
+    """Fake driver exposing the subset of the selenium-wire API the chat harvester uses."""
+
+    def __init__(self, pages: List[Tuple[str, str, bytes]], pages_per_scroll: int = 1):
+        self._pending = [_ReplayRequest(url, body, enc) for url, enc, body in pages]
+        self.pages_per_scroll = pages_per_scroll
+        self.requests = []
+        self.scopes = []
+        self.response_interceptor = None
+        self._release(1)
+
+    def _release(self, n: int) -> None:
+        for _ in range(n):
+            if not self._pending:
+                return
+            req = self._pending.pop(0)
+            self.requests.append(req)
+            if self.response_interceptor is not None:
+                self.response_interceptor(req, req.response)
+
+    def get(self, url: str) -> None:
+        pass
+
+    def refresh(self) -> None:
+        pass
+
+    def add_cookie(self, cookie: dict) -> None:
+        pass
+
+    def execute_script(self, script: str, *args):
+        return None
+
+    def execute_async_script(self, script: str, *args):
+        self._release(self.pages_per_scroll)
+        return {"ok": True}
+
+    def quit(self) -> None:
+        pass
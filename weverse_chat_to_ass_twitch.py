@@ -2,11 +2,21 @@
 # weverse_chat_to_ass_twitch.py
 
 import argparse
+import hashlib
 import json
+import os
 import re
+import struct
+import time
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from weverse_chat_archive import ChatArchive, is_archive, load_messages
+from weverse_chat_meta import chat_meta_path, read_chat_meta, to_epoch_ms
+from weverse_metrics import METRICS, add_metrics_args, write_metrics
+from weverse_profile import add_profile_args, run_profiled
 
 
 def ass_time(t: float) -> str:
@@ -172,6 +182,202 @@ def pick_fields(item: Dict[str, Any]) -> Tuple[Optional[int], str, str]:
     return (int(ts) if ts is not None else None), name, msg
 
 
+def load_chat_items(path: str) -> Any:
+    # Accepts the JSON array written by weverse_chat_dump, NDJSON from its --live mode,
+    # or a .wvca archive.
+    return load_messages(path)
+
+
+def chat_base_time(data: Any) -> Optional[int]:
+    # The message prepare_messages() puts at t=0.
+    times = []
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        ts, name, msg = pick_fields(item)
+        if ts is not None and ts >= 0 and (msg or name):
+            times.append(ts)
+    return min(times) if times else None
+
+
+def resolve_auto_offset(args: argparse.Namespace, base: Optional[int]) -> float:
+    """--offset-seconds plus the gap between the first chat message and the live start."""
+    if args.live_start:
+        start_ms, source = to_epoch_ms(args.live_start), "--live-start"
+        if start_ms is None:
+            raise SystemExit(f"Could not parse --live-start {args.live_start!r}")
+    else:
+        meta_path = args.chat_meta or chat_meta_path(args.chat)
+        meta = read_chat_meta(meta_path) or {}
+        start_ms, source = to_epoch_ms(meta.get("liveStartTime")), meta_path
+        if start_ms is None:
+            print(f"No liveStartTime in {meta_path}; using --offset-seconds only.")
+            return args.offset_seconds
+
+    if base is None:
+        print("Chat has no timestamps; --auto-offset ignored.")
+        return args.offset_seconds
+    offset = (base - start_ms) / 1000.0 + args.offset_seconds
+    print(f"Auto offset {offset:+.2f}s (live start from {source})")
+    return offset
+
+
+def load_chat_clip(
+    args: argparse.Namespace,
+) -> Tuple[Any, Optional[int], float, Tuple[Optional[int], Optional[int]]]:
+    """
+    Chat items for this render, the time of the chat's first message, the sync offset
+    and the messageTime range (ms) actually selected by --from/--to.
+    With --from/--to only messages in that stretch of the video are returned, plus the
+    --hold seconds before --from whose messages may still be on screen when the clip
+    starts; for an archive only those records are read, a JSON chat is loaded in full
+    and filtered.
+    """
+    archive = ChatArchive(args.chat) if is_archive(args.chat) else None
+    try:
+        if archive is not None:
+            data, base = None, archive.base_time()
+        else:
+            data = load_chat_items(args.chat)
+            base = chat_base_time(data)
+
+        offset = args.offset_seconds
+        if args.auto_offset or args.live_start:
+            offset = resolve_auto_offset(args, base)
+
+        # Video time t shows the message sent at base + (t - offset) s.
+        lo_ms = hi_ms = None
+        if base is not None:
+            if args.clip_from is not None:
+                lo_ms = base + int(round((args.clip_from - offset) * 1000))
+            if args.clip_to is not None:
+                hi_ms = base + int(round((args.clip_to - offset) * 1000))
+
+        load_ms = None if lo_ms is None else lo_ms - int(round(args.hold * 1000))
+        if archive is not None:
+            data = archive.slice(load_ms, hi_ms)
+        elif load_ms is not None or hi_ms is not None:
+            kept = []
+            for item in data if isinstance(data, list) else []:
+                ts = pick_fields(item)[0] if isinstance(item, dict) else None
+                if ts is not None and (load_ms is None or ts >= load_ms) and (hi_ms is None or ts < hi_ms):
+                    kept.append(item)
+            data = kept
+    finally:
+        if archive is not None:
+            archive.close()
+    return data, base, offset, (lo_ms, hi_ms)
+
+
+# ---------- density thinning for huge chats ----------
+REPEAT_RUN_RE = re.compile(r"(.)\1{2,}")
+SPACE_RE = re.compile(r"\s+")
+
+
+def is_priority_item(item: Dict[str, Any], priority_names: Set[str]) -> bool:
+    # Artist posts are never dropped by thinning.
+    prof = item.get("profile") or {}
+    if isinstance(prof, dict):
+        if (prof.get("profileType") or "").upper() == "ARTIST":
+            return True
+        if (prof.get("profileName") or "").strip() in priority_names:
+            return True
+    return (item.get("name") or "").strip() in priority_names
+
+
+def spam_key(msg: str) -> str:
+    # "ㅋㅋㅋㅋㅋ", "ㅋㅋㅋ" and "ㅋ ㅋ ㅋ ㅋ" collapse to the same key.
+    return REPEAT_RUN_RE.sub(r"\1\1", SPACE_RE.sub("", msg.lower()))
+
+
+@dataclass
+class ThinStats:
+    total: int = 0
+    kept: int = 0
+    priority: int = 0
+    collapsed: int = 0
+    sampled_out: int = 0
+    capped_windows: int = 0
+    windows: int = 0
+
+    def report(self) -> str:
+        return (
+            f"Density: kept {self.kept}/{self.total} messages "
+            f"({self.priority} priority, {self.collapsed} collapsed duplicates, "
+            f"{self.sampled_out} sampled out; {self.capped_windows}/{self.windows} windows over cap)"
+        )
+
+
+def thin_chat(
+    parsed: List[Tuple[int, str, str, bool]],
+    window_ms: int,
+    max_per_window: int,
+    collapse_spam: bool,
+) -> Tuple[List[Tuple[int, str, str]], ThinStats]:
+    """
+    Caps how many messages are shown per time window. parsed: time-sorted
+    (ts_ms, name, msg, priority). Priority messages are always kept; duplicate
+    spam inside a window is collapsed into its first occurrence with a "×N"
+    count; the rest is sampled evenly down to the cap.
+    """
+    stats = ThinStats(total=len(parsed))
+    out: List[Tuple[int, str, str]] = []
+    window_ms = max(1, window_ms)
+
+    i = 0
+    while i < len(parsed):
+        bucket = parsed[i][0] // window_ms
+        j = i
+        while j < len(parsed) and parsed[j][0] // window_ms == bucket:
+            j += 1
+        window = parsed[i:j]
+        i = j
+        stats.windows += 1
+
+        # (ts, name, msg, priority, order)
+        rows = [(ts, name, msg, prio, n) for n, (ts, name, msg, prio) in enumerate(window)]
+
+        if collapse_spam:
+            first: Dict[str, int] = {}
+            counts: Dict[str, int] = {}
+            deduped = []
+            for row in rows:
+                if row[3]:
+                    deduped.append(row)
+                    continue
+                key = spam_key(row[2])
+                counts[key] = counts.get(key, 0) + 1
+                if key in first:
+                    stats.collapsed += 1
+                    continue
+                first[key] = len(deduped)
+                deduped.append(row)
+            for key, pos in first.items():
+                if counts[key] > 1:
+                    ts, name, msg, prio, n = deduped[pos]
+                    deduped[pos] = (ts, name, f"{msg} ×{counts[key]}", prio, n)
+            rows = deduped
+
+        if max_per_window > 0 and len(rows) > max_per_window:
+            stats.capped_windows += 1
+            prio_rows = [r for r in rows if r[3]]
+            rest = [r for r in rows if not r[3]]
+            slots = max(0, max_per_window - len(prio_rows))
+            if slots < len(rest):
+                picked = [rest[int(k * len(rest) / slots)] for k in range(slots)] if slots else []
+                stats.sampled_out += len(rest) - len(picked)
+                rest = picked
+            rows = sorted(prio_rows + rest, key=lambda r: r[4])
+
+        for ts, name, msg, prio, _ in rows:
+            if prio:
+                stats.priority += 1
+            out.append((ts, name, msg))
+
+    stats.kept = len(out)
+    return out, stats
+
+
 @dataclass
 class Segment:
     start: float
@@ -343,8 +549,7 @@ def build_twitch_segments(
     return messages
 
 
-def make_ass(
-    chat_msgs: List[ChatMsg],
+def ass_header(
     resx: int,
     resy: int,
     margin_l: int,
@@ -354,14 +559,8 @@ def make_ass(
     font_size: int,
     outline: int,
     shadow: int,
-    line_gap: int,
-    shift: float,
-    fade_out: float,
 ) -> str:
-    # Approx line height; good enough to prevent overlap
-    line_h = font_size + line_gap + outline * 2
-
-    header = (
+    return (
         "[Script Info]\n"
         "; Script generated by weverse_chat_to_ass_twitch.py\n"
         "ScriptType: v4.00+\n"
@@ -381,10 +580,32 @@ def make_ass(
         "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
     )
 
+
+def make_ass(
+    chat_msgs: List[ChatMsg],
+    resx: int,
+    resy: int,
+    margin_l: int,
+    margin_r: int,
+    margin_v: int,
+    font_name: str,
+    font_size: int,
+    outline: int,
+    shadow: int,
+    line_gap: int,
+    shift: float,
+    fade_out: float,
+    header: bool = True,
+) -> str:
+    # Approx line height; good enough to prevent overlap
+    line_h = font_size + line_gap + outline * 2
+
+    head = ass_header(resx, resy, margin_l, margin_r, margin_v, font_name, font_size, outline, shadow) if header else ""
+
     shift_ms = int(round(shift * 1000))
     fade_ms = int(round(fade_out * 1000))
 
-    lines: List[str] = [header]
+    lines: List[str] = [head]
 
     x = margin_l
 
@@ -423,15 +644,293 @@ def make_ass(
     return "".join(lines)
 
 
-def main() -> int:
+def make_ass_stacked(
+    chat_msgs: List[ChatMsg],
+    resx: int,
+    resy: int,
+    margin_l: int,
+    margin_r: int,
+    margin_v: int,
+    font_name: str,
+    font_size: int,
+    outline: int,
+    shadow: int,
+    header: bool = True,
+) -> str:
+    """
+    One Dialogue line per stack state instead of one per message segment: the
+    visible messages are joined top-to-bottom with \\N and anchored at the bottom
+    slot. Only valid without shift animation or fade (each message can no longer
+    move or fade on its own). ASS allows one position per Dialogue, so lines are
+    spaced by the font's own line height rather than the per-message slot pitch
+    (font_size + line_gap + 2 * outline): same messages and timing, but not a
+    pixel-identical layout.
+    """
+    head = ass_header(resx, resy, margin_l, margin_r, margin_v, font_name, font_size, outline, shadow) if header else ""
+    texts = [render_chat_text(cm.name, cm.msg) for cm in chat_msgs]
+
+    # Sweep over segment boundaries, tracking which message sits in which slot.
+    starts: Dict[float, List[Tuple[int, int]]] = {}
+    ends: Dict[float, List[int]] = {}
+    for i, cm in enumerate(chat_msgs):
+        for seg in cm.segments:
+            starts.setdefault(seg.start, []).append((i, seg.slot))
+            ends.setdefault(seg.end, []).append(i)
+
+    active: Dict[int, int] = {}  # message index -> slot
+    frames: List[Tuple[float, float, Tuple[Tuple[int, int], ...]]] = []
+    times = sorted(set(starts) | set(ends))
+    for k, t in enumerate(times):
+        for i in ends.get(t, ()):
+            active.pop(i, None)
+        for i, slot in starts.get(t, ()):
+            active[i] = slot
+        if k + 1 == len(times) or not active:
+            continue
+        state = tuple(sorted(active.items(), key=lambda it: it[1]))
+        t_next = times[k + 1]
+        if frames and frames[-1][2] == state and abs(frames[-1][1] - t) <= 1e-6:
+            frames[-1] = (frames[-1][0], t_next, state)
+        else:
+            frames.append((t, t_next, state))
+
+    x = margin_l
+    y = resy - margin_v
+    lines: List[str] = [head]
+    for start, end, state in frames:
+        start_s, end_s = ass_time(start), ass_time(end)
+        if start_s == end_s:
+            continue
+        parts: List[str] = []
+        next_slot = 0
+        for i, slot in state:  # bottom-up
+            parts.extend(["\\h"] * max(0, slot - next_slot))  # keep gaps if the stack has holes
+            parts.append(texts[i])
+            next_slot = slot + chat_msgs[i].lines
+        text = "\\N".join(reversed(parts))
+        lines.append(
+            f"Dialogue: 0,{start_s},{end_s},Chat,,{margin_l},{margin_r},{margin_v},,{{\\an1\\pos({x},{y})}}{text}\n"
+        )
+
+    return "".join(lines)
+
+
+# ---------- time-sharded parallel rendering ----------
+def find_shard_cuts(msgs_in: List[Tuple[float, str, str, int]], hold: float, shards: int) -> List[int]:
+    """
+    Indices where the stack is guaranteed empty (the previous message expired by
+    the time the next one arrives), thinned to roughly `shards` evenly sized pieces.
+    msgs_in must be time-sorted.
+    """
+    if shards <= 1 or len(msgs_in) < 2:
+        return []
+    target = len(msgs_in) / shards
+    cuts: List[int] = []
+    last_cut = 0
+    latest_expire = msgs_in[0][0] + hold
+    for i in range(1, len(msgs_in)):
+        t = msgs_in[i][0]
+        if t >= latest_expire and i - last_cut >= target:
+            cuts.append(i)
+            last_cut = i
+        latest_expire = max(latest_expire, t + hold)
+    return cuts
+
+
+def render_events_shard(job: Tuple[Any, ...]) -> Tuple[str, int]:
+    """Process-pool worker: simulate one shard and render its [Events] lines (no header)."""
+    msgs_in, hold, max_lines, coalesce, style, lead = job
+    chat_msgs = trim_layout(build_twitch_segments(msgs_in=msgs_in, hold=hold, max_lines=max_lines), lead)
+    segments = sum(len(m.segments) for m in chat_msgs)
+    return render_events(chat_msgs, coalesce, style), segments
+
+
+def render_events(chat_msgs: List[ChatMsg], coalesce: bool, style: Dict[str, Any]) -> str:
+    if coalesce:
+        keys = ("resx", "resy", "margin_l", "margin_r", "margin_v", "font_name", "font_size", "outline", "shadow")
+        return make_ass_stacked(chat_msgs=chat_msgs, header=False, **{k: style[k] for k in keys})
+    return make_ass(chat_msgs=chat_msgs, header=False, **style)
+
+
+def render_parallel(
+    msgs_in: List[Tuple[float, str, str, int]],
+    hold: float,
+    max_lines: int,
+    coalesce: bool,
+    style: Dict[str, Any],
+    jobs: int,
+    lead: float = 0.0,
+) -> Tuple[str, int]:
+    """
+    Simulate and render in a process pool. Shards are split where the stack is
+    empty, so concatenating their events in order matches single-process output.
+    If the chat never empties (e.g. with a long --hold) there is nothing to split
+    and everything runs in this process; shipping the messages to workers just to
+    format them costs more than it saves. `lead` is passed on to trim_layout().
+    """
+    cuts = find_shard_cuts(msgs_in, hold, jobs * 4)  # extra shards even out the load
+    if not cuts:
+        print("No quiet gap in the chat to split at; rendering in one process")
+        chat_msgs = trim_layout(build_twitch_segments(msgs_in=msgs_in, hold=hold, max_lines=max_lines), lead)
+        segments = sum(len(m.segments) for m in chat_msgs)
+        return render_simulated(chat_msgs, coalesce, style), segments
+
+    bounds = [0] + cuts + [len(msgs_in)]
+    shard_jobs = [(msgs_in[a:b], hold, max_lines, coalesce, style, lead) for a, b in zip(bounds, bounds[1:])]
+    print(f"Rendering {len(shard_jobs)} time shards on {jobs} workers")
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(render_events_shard, shard_jobs))
+    return style_header(style) + "".join(text for text, _ in results), sum(n for _, n in results)
+
+
+def render_simulated(chat_msgs: List[ChatMsg], coalesce: bool, style: Dict[str, Any]) -> str:
+    """Full ASS text for already simulated messages."""
+    return style_header(style) + render_events(chat_msgs, coalesce, style)
+
+
+def style_header(style: Dict[str, Any]) -> str:
+    return ass_header(
+        style["resx"], style["resy"], style["margin_l"], style["margin_r"], style["margin_v"],
+        style["font_name"], style["font_size"], style["outline"], style["shadow"],
+    )
+
+
+# ---------- layout cache for fast re-renders ----------
+# Wrapping and simulation depend only on the chat, the wrap width and the stack
+# parameters. Everything else (colors, fonts, vertical placement, animation, a
+# non-negative offset) is applied when writing, so a cached layout can be reused.
+SEGMENT_CACHE_MAGIC = b"WVSEG\x00\x01\x00"
+_SEG_STRUCT = struct.Struct("<ddiiB")
+_MSG_STRUCT = struct.Struct("<ddHI")
+
+
+def layout_cache_key(
+    args: argparse.Namespace,
+    max_cells: int,
+    sim_offset: float,
+    clip_ms: Tuple[Optional[int], Optional[int]] = (None, None),
+) -> str:
+    h = hashlib.sha256()
+    with open(args.chat, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    params = {
+        "max_cells": max_cells,
+        "hold": args.hold,
+        "max_lines": max(1, args.max_lines),
+        "offset": sim_offset,
+        "max_per_window": args.max_per_window,
+        "density_window": args.density_window,
+        "collapse_spam": args.collapse_spam,
+        "priority_name": sorted(args.priority_name or []),
+    }
+    if clip_ms != (None, None):
+        # The resolved message range: the same --from/--to selects other messages under another offset.
+        params["clip_ms"] = list(clip_ms)
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def save_layout_cache(path: str, chat_msgs: List[ChatMsg]) -> None:
+    parts = [SEGMENT_CACHE_MAGIC, struct.pack("<I", len(chat_msgs))]
+    for cm in chat_msgs:
+        name = cm.name.encode("utf-8")
+        msg = cm.msg.encode("utf-8")
+        parts.append(_MSG_STRUCT.pack(cm.start, cm.expire, cm.lines, len(cm.segments)))
+        parts.append(struct.pack("<II", len(name), len(msg)))
+        parts.append(name)
+        parts.append(msg)
+        for seg in cm.segments:
+            move = -1 if seg.move_from_slot is None else seg.move_from_slot
+            parts.append(_SEG_STRUCT.pack(seg.start, seg.end, seg.slot, move, seg.final))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(parts))
+    os.replace(tmp, path)
+
+
+def load_layout_cache(path: str) -> Optional[List[ChatMsg]]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(SEGMENT_CACHE_MAGIC):
+        return None
+    pos = len(SEGMENT_CACHE_MAGIC)
+    (count,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    chat_msgs: List[ChatMsg] = []
+    for idx in range(count):
+        start, expire, lines, n_segs = _MSG_STRUCT.unpack_from(data, pos)
+        pos += _MSG_STRUCT.size
+        name_len, msg_len = struct.unpack_from("<II", data, pos)
+        pos += 8
+        name = data[pos : pos + name_len].decode("utf-8")
+        pos += name_len
+        msg = data[pos : pos + msg_len].decode("utf-8")
+        pos += msg_len
+        segments: List[Segment] = []
+        for seg_start, seg_end, slot, move, final in _SEG_STRUCT.iter_unpack(data[pos : pos + n_segs * _SEG_STRUCT.size]):
+            segments.append(Segment(seg_start, seg_end, slot, None if move < 0 else move, bool(final)))
+        pos += n_segs * _SEG_STRUCT.size
+        chat_msgs.append(ChatMsg(idx=idx, start=start, expire=expire, name=name, msg=msg, lines=lines, segments=segments))
+    return chat_msgs
+
+
+def shift_layout(chat_msgs: List[ChatMsg], offset: float) -> None:
+    if not offset:
+        return
+    for cm in chat_msgs:
+        cm.start += offset
+        cm.expire += offset
+        for seg in cm.segments:
+            seg.start += offset
+            seg.end += offset
+
+
+def trim_layout(chat_msgs: List[ChatMsg], lead: float) -> List[ChatMsg]:
+    """
+    Move a layout simulated `lead` seconds late back to its real times and cut it
+    at 0: segments that ended before 0 are dropped, ones on screen at 0 start there.
+    Used for clips, whose chat from before --from is simulated only to fill the stack.
+    """
+    if not lead:
+        return chat_msgs
+    shift_layout(chat_msgs, -lead)
+    kept: List[ChatMsg] = []
+    for cm in chat_msgs:
+        cm.segments = [seg for seg in cm.segments if seg.end > 0.0]
+        for seg in cm.segments:
+            if seg.start < 0.0:
+                seg.start = 0.0
+                seg.move_from_slot = None  # its move happened before the clip
+        if cm.segments:
+            kept.append(cm)
+    return kept
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--chat", required=True, help="Input chat JSON (Weverse paginator output)")
+    ap.add_argument("--chat", required=True, help="Input chat JSON, NDJSON or .wvca archive (Weverse paginator output)")
     ap.add_argument("--ass", required=True, help="Output .ass path")
     ap.add_argument("--max-lines", type=int, default=6, help="Max lines visible (Twitch-style stack)")
     ap.add_argument("--hold", type=float, default=3600.0, help="Seconds each message lives (unless pushed out)")
     ap.add_argument("--shift", type=float, default=0.0, help="Seconds to animate stack movement (0 = no animation)")
     ap.add_argument("--fade-out", type=float, default=0.0, help="Fade-out seconds when a message disappears")
     ap.add_argument("--offset-seconds", type=float, default=0.0, help="Manual sync offset (+ delays chat, - advances chat)")
+    ap.add_argument(
+        "--auto-offset",
+        action="store_true",
+        help="Sync to the live start time saved by weverse_chat_dump (<chat>.meta.json); --offset-seconds then fine-tunes",
+    )
+    ap.add_argument("--chat-meta", help="Metadata JSON with liveStartTime (default: <chat stem>.meta.json)")
+    ap.add_argument("--live-start", help="Live start as epoch seconds/ms or ISO 8601; implies --auto-offset")
+    ap.add_argument(
+        "--from",
+        dest="clip_from",
+        type=float,
+        help="Render only chat from this many seconds into the video; output times start here (pair with ffmpeg -ss)",
+    )
+    ap.add_argument("--to", dest="clip_to", type=float, help="Render only chat up to this many seconds into the video")
     ap.add_argument("--resx", type=int, default=1080)
     ap.add_argument("--resy", type=int, default=1920)
     ap.add_argument("--margin-l", type=int, default=10)
@@ -442,63 +941,121 @@ def main() -> int:
     ap.add_argument("--outline", type=int, default=2)
     ap.add_argument("--shadow", type=int, default=0)
     ap.add_argument("--line-gap", type=int, default=2)
+    ap.add_argument("--max-per-window", type=int, default=0, help="Density mode: max messages shown per window (0 = off)")
+    ap.add_argument("--density-window", type=float, default=10.0, help="Density mode: window length in seconds")
+    ap.add_argument("--collapse-spam", action="store_true", help="Collapse repeated messages (e.g. ㅋㅋㅋ) within a window into one with a count")
+    ap.add_argument("--priority-name", action="append", help="Profile name never dropped by density mode (repeatable); artist profiles are always kept")
+    ap.add_argument(
+        "--coalesce",
+        action="store_true",
+        help=(
+            "One dialogue line per stack state instead of per message segment (needs --shift 0 --fade-out 0); "
+            "lines are spaced by the font's own line height instead of the per-message slots, "
+            "so the layout differs slightly and --line-gap and --outline do not change spacing"
+        ),
+    )
+    ap.add_argument("--cache-dir", help="Cache wrapped/simulated layouts here; style or offset-only changes re-render from cache")
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Worker processes for time-sharded rendering; shards split where the chat goes quiet for --hold "
+            "seconds, so with the default --hold the render stays in one process"
+        ),
+    )
+    add_metrics_args(ap)
+    add_profile_args(ap)
 
-    args = ap.parse_args()
+    return ap.parse_args(argv)
 
-    max_cells = estimate_max_cells(
-        resx=args.resx,
-        margin_l=args.margin_l,
-        margin_r=args.margin_r,
-        font_size=args.font_size,
-        outline=args.outline,
-    )
 
-    with open(args.chat, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def prepare_messages(
+    args: argparse.Namespace, max_cells: int, offset: float, data: Any = None, base: Optional[int] = None
+) -> List[Tuple[float, str, str, int]]:
+    """
+    Load, filter, thin and wrap the chat into (time_seconds, name, wrapped_message, line_count).
+    Times count from `base` (default: the first message in `data`).
+    """
+    if data is None:
+        with METRICS.stage("chat_load"):
+            data = load_chat_items(args.chat)
 
     if not isinstance(data, list):
         raise SystemExit("Chat JSON must be a list of messages.")
 
-    parsed: List[Tuple[int, str, str]] = []
+    priority_names = set(args.priority_name or [])
+    parsed: List[Tuple[int, str, str, bool]] = []
     for item in data:
         if not isinstance(item, dict):
             continue
         ts, name, msg = pick_fields(item)
         if not msg and not name:
             continue
-        parsed.append((ts if ts is not None else -1, name, msg))
+        parsed.append((ts if ts is not None else -1, name, msg, is_priority_item(item, priority_names)))
+    METRICS.incr("messages", len(parsed))
 
     # If we have timestamps, sort and zero them
-    have_ts = any(ts >= 0 for ts, _, _ in parsed)
+    have_ts = any(p[0] >= 0 for p in parsed)
+    thinning = args.max_per_window > 0 or args.collapse_spam
+    wrap_t0 = time.perf_counter()
     if have_ts:
         parsed = [p for p in parsed if p[0] >= 0]
         parsed.sort(key=lambda x: x[0])
-        base = parsed[0][0]
+        if base is None:
+            base = parsed[0][0]
+        if thinning:
+            with METRICS.stage("thinning"):
+                thinned, thin_stats = thin_chat(
+                    parsed,
+                    window_ms=int(args.density_window * 1000),
+                    max_per_window=args.max_per_window,
+                    collapse_spam=args.collapse_spam,
+                )
+            print(thin_stats.report())
+            METRICS.incr("messages_dropped", thin_stats.total - thin_stats.kept)
+        else:
+            thinned = [p[:3] for p in parsed]
         msgs_in: List[Tuple[float, str, str, int]] = []
-        for ts, name, msg in parsed:
-            t = (ts - base) / 1000.0 + args.offset_seconds
+        for ts, name, msg in thinned:
+            t = (ts - base) / 1000.0 + offset
             if t < 0:
                 t = 0.0
             wrapped_msg, line_count = wrap_message_text(name, msg, max_cells)
             msgs_in.append((t, name, wrapped_msg, line_count))
     else:
         # Fallback: no timestamps; space them out 1s apart
+        if thinning:
+            print("Density thinning skipped: chat has no timestamps.")
         msgs_in = []
-        for i, (_, name, msg) in enumerate(parsed):
-            t = i * 1.0 + args.offset_seconds
+        for i, (_, name, msg, _) in enumerate(parsed):
+            t = i * 1.0 + offset
             if t < 0:
                 t = 0.0
             wrapped_msg, line_count = wrap_message_text(name, msg, max_cells)
             msgs_in.append((t, name, wrapped_msg, line_count))
+    METRICS.observe("wrap", time.perf_counter() - wrap_t0)
+    return msgs_in
+
 
-    chat_msgs = build_twitch_segments(
-        msgs_in=msgs_in,
-        hold=args.hold,
-        max_lines=max(1, args.max_lines),
+def render(args: argparse.Namespace) -> int:
+    max_cells = estimate_max_cells(
+        resx=args.resx,
+        margin_l=args.margin_l,
+        margin_r=args.margin_r,
+        font_size=args.font_size,
+        outline=args.outline,
     )
 
-    ass_text = make_ass(
-        chat_msgs=chat_msgs,
+    coalesce = args.coalesce
+    if coalesce and (args.shift > 0 or args.fade_out > 0):
+        print("--coalesce needs --shift 0 and --fade-out 0; writing one line per segment instead.")
+        coalesce = False
+    if coalesce:
+        # Stacked lines are one \N-joined event; the renderer spaces them, not our slot pitch.
+        print("Note: with --coalesce, line spacing follows the font's line height; --line-gap/--outline do not change it.")
+
+    style = dict(
         resx=args.resx,
         resy=args.resy,
         margin_l=args.margin_l,
@@ -513,13 +1070,88 @@ def main() -> int:
         fade_out=max(0.0, args.fade_out),
     )
 
-    with open(args.ass, "w", encoding="utf-8-sig", newline="") as f:
-        f.write(ass_text)
-
-    total_segments = sum(len(m.segments) for m in chat_msgs)
-    print(f"Wrote: {args.ass} ({total_segments} dialogue segments)")
+    offset, data, base, clip_ms = args.offset_seconds, None, None, (None, None)
+    lead = 0.0
+    if args.auto_offset or args.live_start or args.clip_from is not None or args.clip_to is not None:
+        with METRICS.stage("chat_load"):
+            data, base, offset, clip_ms = load_chat_clip(args)
+        # A clip's subtitles start at --from, so they line up with a video cut there.
+        offset -= args.clip_from or 0.0
+        if clip_ms[0] is not None:
+            # Chat from the --hold seconds before --from is simulated `lead` seconds late,
+            # so it is not clamped to 0, then trimmed: the clip opens with a full stack.
+            lead = args.hold
+
+    if args.cache_dir:
+        # A negative offset clamps early messages to 0 and changes the layout, so it is
+        # part of the key; a non-negative one is a plain time shift applied afterwards.
+        sim_offset = min(0.0, offset + lead)
+        cache_path = os.path.join(args.cache_dir, layout_cache_key(args, max_cells, sim_offset, clip_ms) + ".seg")
+        chat_msgs = None
+        if os.path.exists(cache_path):
+            with METRICS.stage("cache_load"):
+                chat_msgs = load_layout_cache(cache_path)
+        if chat_msgs is not None:
+            print(f"Layout cache hit: {cache_path}")
+            METRICS.incr("cache_hits")
+        else:
+            msgs_in = prepare_messages(args, max_cells, sim_offset, data, base)
+            with METRICS.stage("simulation"):
+                chat_msgs = build_twitch_segments(msgs_in=msgs_in, hold=args.hold, max_lines=max(1, args.max_lines))
+            with METRICS.stage("cache_save"):
+                save_layout_cache(cache_path, chat_msgs)
+            print(f"Layout cached: {cache_path}")
+        shift_layout(chat_msgs, offset + lead - sim_offset)
+        chat_msgs = trim_layout(chat_msgs, lead)
+        total_segments = sum(len(m.segments) for m in chat_msgs)
+        with METRICS.stage("ass_render"):
+            ass_text = render_simulated(chat_msgs, coalesce, style)
+    elif args.jobs > 1:
+        msgs_in = prepare_messages(args, max_cells, offset + lead, data, base)
+        with METRICS.stage("parallel_render"):
+            ass_text, total_segments = render_parallel(
+                msgs_in, args.hold, max(1, args.max_lines), coalesce, style, args.jobs, lead
+            )
+    else:
+        msgs_in = prepare_messages(args, max_cells, offset + lead, data, base)
+        with METRICS.stage("simulation"):
+            chat_msgs = build_twitch_segments(
+                msgs_in=msgs_in,
+                hold=args.hold,
+                max_lines=max(1, args.max_lines),
+            )
+        chat_msgs = trim_layout(chat_msgs, lead)
+        total_segments = sum(len(m.segments) for m in chat_msgs)
+        with METRICS.stage("ass_render"):
+            ass_text = render_simulated(chat_msgs, coalesce, style)
+    METRICS.incr("segments", total_segments)
+
+    with METRICS.stage("ass_write"):
+        tmp = args.ass + ".tmp"
+        with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+            f.write(ass_text)
+        os.replace(tmp, args.ass)
+
+    METRICS.incr("ass_bytes", len(ass_text))
+    if coalesce:
+        events = ass_text.count("\nDialogue: ")
+        print(
+            f"Wrote: {args.ass} ({events} stacked dialogue lines instead of {total_segments} segments, "
+            f"{len(ass_text.encode('utf-8')) / 1e6:.1f} MB)"
+        )
+    else:
+        print(f"Wrote: {args.ass} ({total_segments} dialogue segments)")
     return 0
 
 
+def main() -> int:
+    args = parse_args()
+    METRICS.script = "weverse_chat_to_ass_twitch"
+    try:
+        return run_profiled(lambda: render(args), args, METRICS.script)
+    finally:
+        write_metrics(args.metrics, args.metrics_format)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,40 +1,29 @@
+import argparse
 import os
 import sys
 import re
-import subprocess
+import tempfile
 from datetime import datetime
 
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium import webdriver
 
-
-def load_cookies_from_txt(driver, cookie_file):
-    """
-    Loads cookies from a text file and adds them to the current driver session.
-    The text file should contain a single cookie string with cookies separated by semicolons.
-    """
-    with open(cookie_file, "r", encoding="utf-8") as f:
-        cookie_str = f.read().strip()
-    cookies = cookie_str.split(";")
-    for cookie in cookies:
-        cookie = cookie.strip()
-        if not cookie:
-            continue
-        parts = cookie.split("=", 1)
-        if len(parts) != 2:
-            continue
-        name, value = parts
-        cookie_dict = {"name": name, "value": value, "domain": "weverse.io"}
-        try:
-            driver.add_cookie(cookie_dict)
-        except Exception as e:
-            print(f"Could not add cookie {cookie_dict}: {e}")
+from weverse_browser import add_browser_args, apply_lite_options, block_heavy_resources
+from weverse_metrics import METRICS, add_metrics_args, write_metrics
+from weverse_profile import add_profile_args, run_profiled
+from weverse_ratelimit import SCHEDULER, add_ratelimit_args, configure_scheduler
+from weverse_download import add_download_args, download
+from weverse_mux import MuxJob, add_mux_args, default_output, find_subtitles, run_job
+from weverse_session import add_session_args, authenticate, check_cookie_file, use_user_data_dir, write_netscape_cookies
+from weverse_store import VideoStore, link_or_copy, same_file, video_id_from_url
+from weverse_transcribe import add_vad_args, transcribe
 
 
-def extract_video_info(url, cookie_file):
+def extract_video_info(url, cookie_file, user_data_dir=None, lite=False):
     """
     Logs in using cookies, navigates to the video page,
     and extracts the artist's name, group, date, and title information.
@@ -44,24 +33,34 @@ def extract_video_info(url, cookie_file):
     options.add_argument(
         "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36"
     )
-    driver = webdriver.Chrome(options=options)
+    use_user_data_dir(options, user_data_dir)
+    if lite:
+        apply_lite_options(options)
+    with METRICS.stage("browser_startup"):
+        driver = webdriver.Chrome(options=options)
+        if lite:
+            block_heavy_resources(driver)
 
     try:
-        driver.get("https://weverse.io/")
-        load_cookies_from_txt(driver, cookie_file)
-        driver.refresh()
+        with METRICS.stage("cookie_bootstrap"):
+            authenticate(driver, cookie_file, user_data_dir)
 
-        driver.get(url)
         wait = WebDriverWait(driver, 30)
 
-        artist_elem = wait.until(EC.presence_of_element_located(
-            (By.CSS_SELECTOR, ".LiveArtistProfileView_artist_wrap__nOs54 ul.LiveArtistProfileView_name_list__DDCHd li.LiveArtistProfileView_name_item__8W66y")
-        ))
-        artist_text = artist_elem.text.strip()
+        def load():
+            driver.get(url)
+            return wait.until(EC.presence_of_element_located(
+                (By.CSS_SELECTOR, ".LiveArtistProfileView_artist_wrap__nOs54 ul.LiveArtistProfileView_name_list__DDCHd li.LiveArtistProfileView_name_item__8W66y")
+            ))
 
-        wait.until(EC.presence_of_element_located(
-            (By.CLASS_NAME, "LiveArtistProfileView_info__dICbs")
-        ))
+        with METRICS.stage("metadata_wait"):
+            # Retried with backoff when the page errors out or never renders the artist.
+            artist_elem = SCHEDULER.call(url, load, retry_on=(WebDriverException,))
+            artist_text = artist_elem.text.strip()
+
+            wait.until(EC.presence_of_element_located(
+                (By.CLASS_NAME, "LiveArtistProfileView_info__dICbs")
+            ))
         info_elements = driver.find_elements(By.CLASS_NAME, "LiveArtistProfileView_info__dICbs")
         if len(info_elements) < 2:
             print("Error: Could not find both group and date information.")
@@ -81,25 +80,54 @@ def extract_video_info(url, cookie_file):
         driver.quit()
 
 
-def format_date(date_str):
+def parse_live_date(date_str):
     """
-    Converts a date string like "Nov 9, 2024, 03:22" or "Feb 23, 01:38" into a formatted string "YYMMDD_HHMM".
+    Parses a date string like "Nov 9, 2024, 03:22" or "Feb 23, 01:38" (local time, as shown on the page).
     If the year is missing, the current year is assumed.
     """
     try:
-        dt = datetime.strptime(date_str, "%b %d, %Y, %H:%M")
+        return datetime.strptime(date_str, "%b %d, %Y, %H:%M")
     except ValueError:
         current_year = datetime.now().year
         new_date_str = f"{date_str}, {current_year}"
-        dt = datetime.strptime(new_date_str, "%b %d, %H:%M, %Y")
-    return dt.strftime("%y%m%d_%H%M")
+        return datetime.strptime(new_date_str, "%b %d, %H:%M, %Y")
 
 
-def process_video(video_url, cookie_file):
-    print("\nProcessing video:", video_url)
-    # Extract info from the video page.
-    artist_text, group_text, date_text, video_title = extract_video_info(video_url, cookie_file)
+def format_date(date_str):
+    """
+    Converts a date string like "Nov 9, 2024, 03:22" or "Feb 23, 01:38" into a formatted string "YYMMDD_HHMM".
+    """
+    return parse_live_date(date_str).strftime("%y%m%d_%H%M")
+
+
+def mux_output(video_path, mux_args):
+    """Mux (or burn) the subtitles sitting next to a finished download."""
+    srt, ass = find_subtitles(video_path)
+    container = mux_args.format or ("mkv" if ass and not mux_args.burn else "mp4")
+    job = MuxJob(
+        video=video_path,
+        out=default_output(video_path, container, mux_args.burn),
+        srt=srt,
+        ass=ass,
+        fonts=mux_args.attach_font or [],
+    )
+    run_job(job, mux_args, mux_args.threads)
+
+
+def video_info_record(video_url, artist_text, group_text, date_text, video_title):
+    return {
+        "url": video_url,
+        "artist": artist_text,
+        "group": group_text,
+        "date": date_text,
+        "title": video_title,
+        # Minute precision only; usable as --chat-meta for chat rendering.
+        "liveStartTime": int(parse_live_date(date_text).timestamp() * 1000),
+    }
 
+
+def output_folder_name(artist_text, date_text):
+    """The "[ENG SUB] YYMMDD_HHMM STAYC <member> Weverse LIVE" folder for a video."""
     # Map artist names (or emojis) to desired shorthand.
     artist_map = {
         "STAYC": "STAYC",
@@ -113,11 +141,40 @@ def process_video(video_url, cookie_file):
     group_member = artist_map.get(artist_text, artist_text[0] if artist_text else "UNK")
     formatted_date = format_date(date_text)
 
-    # Build the folder name.
     if group_member == "STAYC":
-        folder_name = f"[ENG SUB] {formatted_date} STAYC Weverse LIVE"
+        return f"[ENG SUB] {formatted_date} STAYC Weverse LIVE"
+    return f"[ENG SUB] {formatted_date} STAYC {group_member} Weverse LIVE"
+
+
+def process_video(
+    video_url,
+    cookie_file,
+    mux_args=None,
+    store=None,
+    fragments=1,
+    rate=0,
+    vad_args=None,
+    user_data_dir=None,
+    ytdlp_cookies=None,
+    lite=False,
+):
+    print("\nProcessing video:", video_url)
+    video_id = video_id_from_url(video_url)
+    info = store.load_info(video_id) if store else None
+    if info:
+        print(f"Using stored metadata for {video_id}")
+        METRICS.incr("metadata_cache_hits")
+        artist_text, group_text, date_text, video_title = (
+            info["artist"], info["group"], info["date"], info["title"]
+        )
     else:
-        folder_name = f"[ENG SUB] {formatted_date} STAYC {group_member} Weverse LIVE"
+        # Extract info from the video page.
+        artist_text, group_text, date_text, video_title = extract_video_info(video_url, cookie_file, user_data_dir, lite)
+        if store:
+            store.save_info(video_id, video_info_record(video_url, artist_text, group_text, date_text, video_title))
+
+    formatted_date = format_date(date_text)
+    folder_name = output_folder_name(artist_text, date_text)
 
     # Initial file name (base name)
     base_file_name = f"{folder_name}.mp4"
@@ -127,8 +184,8 @@ def process_video(video_url, cookie_file):
 
     output_path = os.path.join(folder_name, base_file_name)
 
-    # Check for duplicate file in the same directory.
-    if os.path.exists(output_path):
+    # Check for duplicate file in the same directory (a link to this video's stored copy is not one).
+    if os.path.exists(output_path) and not (store and same_file(output_path, store.video_path(video_id))):
         current_time = datetime.now().strftime("%H%M%S")
         # Append the current time to the base file name to avoid duplicates.
         base_file_name = f"{folder_name}_{current_time}.mp4"
@@ -141,38 +198,60 @@ def process_video(video_url, cookie_file):
     print(f"  Title: {video_title}")
     print(f"  Output Folder: {folder_name}")
     print(f"  Output File: {base_file_name}")
-    
-    download_command = [
-        "yt-dlp",
-        "-f", "best",
-        "-o", output_path,
-        "--recode-video", "mp4",
-        video_url
-    ]
-    print("Executing command:", " ".join(download_command))
-
-    download_result = subprocess.run(download_command)
-    if download_result.returncode == 0:
+
+    # With a store, yt-dlp and WhisperX write into the store and the folder gets links.
+    download_path = store.video_path(video_id) if store else output_path
+    if store and store.has_video(video_id):
+        print(f"Already downloaded: {download_path}")
+        METRICS.incr("download_cache_hits")
+        download_ok = True
+    else:
+        if store:
+            store.entry_dir(video_id, create=True)
+        download_ok = download(video_url, download_path, fragments, rate, cookies=ytdlp_cookies)
+
+    if download_ok:
+        if store:
+            link_or_copy(download_path, output_path)
         print("Download completed successfully!")
         print(f"File saved as: {output_path}")
-        print("Starting translation using WhisperX in the 'whisperx' conda environment...")
 
-        # Execute the translation command.
-        translation_command = (
-            f'conda run -n whisperx_env whisperx --language ko --task translate --model large-v3 '
-            f'--output_format srt --compute_type float32 --output_dir "{folder_name}" --chunk_size 5 "{output_path}"'
-        )
-        print("Executing translation command:", translation_command)
-        translation_result = subprocess.run(translation_command, shell=True)
-        if translation_result.returncode == 0:
-            # Derive subtitle file name from the video file name.
-            srt_filename = base_file_name.replace(".mp4", ".srt")
-            subtitle_path = os.path.join(folder_name, srt_filename)
+        # Derive subtitle file name from the video file name.
+        srt_filename = base_file_name.replace(".mp4", ".srt")
+        subtitle_path = os.path.join(folder_name, srt_filename)
+        if store and store.has_srt(video_id):
+            print(f"Using stored transcription for {video_id}")
+            METRICS.incr("transcription_cache_hits")
+            translation_ok = True
+        else:
+            print("Starting translation using WhisperX in the 'whisperx' conda environment...")
+            whisper_dir = os.path.dirname(download_path) if store else folder_name
+            if vad_args is not None and (vad_args.vad or vad_args.shards > 1):
+                srt = transcribe(
+                    download_path,
+                    whisper_dir,
+                    vad=vad_args.vad,
+                    noise_db=vad_args.vad_noise_db,
+                    min_silence=vad_args.vad_min_silence,
+                    shards=vad_args.shards,
+                )
+            else:
+                srt = transcribe(download_path, whisper_dir)
+            translation_ok = srt is not None
+            if translation_ok:
+                METRICS.incr("transcriptions")
+
+        if translation_ok:
+            if store and store.has_srt(video_id):
+                link_or_copy(store.srt_path(video_id), subtitle_path)
             if os.path.exists(subtitle_path):
                 print(f"Subtitle file saved to: {subtitle_path}")
+                if mux_args is not None:
+                    mux_output(output_path, mux_args)
             else:
                 print("Subtitle file not found in the specified folder.")
         else:
+            METRICS.incr("transcription_failures")
             print("Translation failed.")
 
         # Write the video title to a title file named based on the video file name.
@@ -189,12 +268,28 @@ def process_video(video_url, cookie_file):
 
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python download_and_translate.py <cookie_file> <links_file>")
-        sys.exit(1)
-
-    cookie_file = sys.argv[1]
-    links_file = sys.argv[2]
+    ap = argparse.ArgumentParser(description="Download and translate the Weverse lives listed in a links file.")
+    ap.add_argument("cookie_file", help="Cookies txt path")
+    ap.add_argument("links_file", help="File with one video URL per line (see weverse_scrape.py)")
+    ap.add_argument("--mux", action="store_true", help="Mux the subtitles into the video after transcription (see weverse_mux.py)")
+    ap.add_argument(
+        "--store",
+        help="Keep downloads in this content-addressed store (e.g. weverse_store) and hardlink them into the [ENG SUB] folders",
+    )
+    add_download_args(ap)
+    add_vad_args(ap)
+    add_mux_args(ap)
+    add_session_args(ap)
+    add_browser_args(ap)
+    add_ratelimit_args(ap)
+    add_metrics_args(ap)
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    METRICS.script = "weverse_dlt"
+    configure_scheduler(args)
+    cookie_file = args.cookie_file
+    links_file = args.links_file
 
     if not os.path.exists(links_file):
         print(f"Links file '{links_file}' not found.")
@@ -206,9 +301,44 @@ def main():
     if not links:
         print("No video links found in the file.")
         sys.exit(1)
+    check_cookie_file(cookie_file)
+
+    # The same live can be listed more than once (reposts, several scrape runs).
+    seen_ids = set()
+    unique_links = []
+    for url in links:
+        video_id = video_id_from_url(url)
+        if video_id not in seen_ids:
+            seen_ids.add(video_id)
+            unique_links.append(url)
+    if len(unique_links) < len(links):
+        print(f"Skipping {len(links) - len(unique_links)} duplicate link(s).")
+    store = VideoStore(args.store) if args.store else None
+
+    def run():
+        # yt-dlp gets the same session as the browser, as a Netscape cookie file.
+        with tempfile.TemporaryDirectory(prefix="weverse_dlt_") as tmp:
+            ytdlp_cookies = write_netscape_cookies(cookie_file, os.path.join(tmp, "cookies.txt"))
+            for video_url in unique_links:
+                with METRICS.stage("video_total"):
+                    process_video(
+                        video_url,
+                        cookie_file,
+                        args if args.mux else None,
+                        store,
+                        fragments=max(1, args.fragments),
+                        rate=args.limit_rate,
+                        vad_args=args,
+                        user_data_dir=args.user_data_dir,
+                        ytdlp_cookies=ytdlp_cookies,
+                        lite=args.lite,
+                    )
+                METRICS.incr("videos")
 
-    for video_url in links:
-        process_video(video_url, cookie_file)
+    try:
+        run_profiled(run, args, METRICS.script)
+    finally:
+        write_metrics(args.metrics, args.metrics_format)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+"""
+Parallel yt-dlp downloads into the video store with a shared connection/bandwidth budget.
+
+    python weverse_download.py video_links.txt --jobs 3 --fragments 8 --max-connections 16 --limit-rate 40M
+    python weverse_dlt.py cookie.txt video_links.txt --store weverse_store   # then finds everything already in the store
+
+Each job fetches HLS fragments concurrently (yt-dlp -N). Jobs only start once their
+fragment connections fit under --max-connections, and --limit-rate is split evenly
+between concurrent jobs so the total stays under the cap. Interrupted downloads keep
+their .part files and resume on the next run.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from weverse_metrics import METRICS, add_metrics_args, write_metrics
+from weverse_profile import add_profile_args, run_profiled
+from weverse_session import check_cookie_file, write_netscape_cookies
+from weverse_store import VideoStore, video_id_from_url
+
+RATE_RE = re.compile(r"^\s*([0-9.]+)\s*([KMG]?)i?B?\s*$", re.IGNORECASE)
+
+
+def parse_rate(text: Optional[str]) -> int:
+    """Bytes per second from "40M", "500K", "1.5MiB"...; 0 means no limit."""
+    if not text:
+        return 0
+    m = RATE_RE.match(text)
+    if not m:
+        raise argparse.ArgumentTypeError(f"bad rate: {text!r}")
+    scale = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}[m.group(2).upper()]
+    return int(float(m.group(1)) * scale)
+
+
+class ConnectionBudget:
+    """Counting semaphore where a job takes all of its connections at once."""
+
+    def __init__(self, total: int):
+        self.total = max(1, total)
+        self.free = self.total
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int) -> int:
+        n = max(1, min(n, self.total))
+        with self._cond:
+            self._cond.wait_for(lambda: self.free >= n)
+            self.free -= n
+        return n
+
+    def release(self, n: int) -> None:
+        with self._cond:
+            self.free += n
+            self._cond.notify_all()
+
+
+def download_command(url: str, out: str, fragments: int = 1, rate: int = 0, cookies: Optional[str] = None) -> List[str]:
+    cmd = [
+        "yt-dlp",
+        "-f", "best",
+        "-o", out,
+        "--recode-video", "mp4",
+        "--continue",
+        "--part",
+        "--retries", "10",
+        "--fragment-retries", "10",
+    ]
+    if fragments > 1:
+        cmd += ["--concurrent-fragments", str(fragments)]
+    if rate > 0:
+        cmd += ["--limit-rate", str(rate)]
+    if cookies:
+        cmd += ["--cookies", cookies]
+    cmd.append(url)
+    return cmd
+
+
+def download(
+    url: str,
+    out: str,
+    fragments: int = 1,
+    rate: int = 0,
+    budget: Optional[ConnectionBudget] = None,
+    cookies: Optional[str] = None,
+) -> bool:
+    taken = budget.acquire(fragments) if budget else fragments
+    try:
+        cmd = download_command(url, out, taken, rate, cookies)
+        print("Executing command:", " ".join(cmd))
+        with METRICS.stage("yt_dlp"):
+            result = subprocess.run(cmd)
+    finally:
+        if budget:
+            budget.release(taken)
+    if result.returncode != 0:
+        METRICS.incr("download_failures")
+        return False
+    METRICS.incr("downloads")
+    return True
+
+
+def download_all(
+    links: List[str],
+    store: VideoStore,
+    jobs: int,
+    fragments: int,
+    max_connections: int,
+    total_rate: int,
+    cookies: Optional[str] = None,
+) -> int:
+    pending = []
+    seen = set()
+    for url in links:
+        video_id = video_id_from_url(url)
+        if video_id in seen:
+            continue
+        seen.add(video_id)
+        if store.has_video(video_id):
+            print(f"Already downloaded: {video_id}")
+            METRICS.incr("download_cache_hits")
+            continue
+        store.entry_dir(video_id, create=True)
+        pending.append((url, store.video_path(video_id)))
+
+    if not pending:
+        print("Nothing to download.")
+        return 0
+
+    workers = max(1, min(jobs, len(pending)))
+    budget = ConnectionBudget(max_connections or workers * fragments)
+    rate = total_rate // workers if total_rate else 0
+    print(f"Downloading {len(pending)} videos, {workers} at a time, {fragments} fragments each")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: download(job[0], job[1], fragments, rate, budget, cookies), pending))
+    failed = len(results) - sum(results)
+    print(f"Downloaded {sum(results)}/{len(pending)} videos.")
+    return 1 if failed else 0
+
+
+def add_download_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--fragments", type=int, default=4, help="Concurrent HLS fragment downloads per video (yt-dlp -N)")
+    ap.add_argument("--limit-rate", type=parse_rate, default=0, help="Total bandwidth cap across all downloads, e.g. 40M")
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Download the Weverse lives in a links file into the video store.")
+    ap.add_argument("links_file", help="File with one video URL per line (see weverse_scrape.py)")
+    ap.add_argument("--cookies", help="cookie.txt (document.cookie) for members-only lives")
+    ap.add_argument("--store", default="weverse_store", help="Video store directory (pass the same --store to weverse_dlt.py)")
+    ap.add_argument("--jobs", type=int, default=2, help="Videos downloaded in parallel")
+    ap.add_argument("--max-connections", type=int, default=0, help="Global cap on fragment connections (default: jobs * fragments)")
+    add_download_args(ap)
+    add_metrics_args(ap)
+    add_profile_args(ap)
+    return ap.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    METRICS.script = "weverse_download"
+    if args.cookies:
+        check_cookie_file(args.cookies)
+    with open(args.links_file, "r", encoding="utf-8") as f:
+        links = [line.strip() for line in f if line.strip()]
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="weverse_dl_") as tmp:
+            cookies = write_netscape_cookies(args.cookies, os.path.join(tmp, "cookies.txt")) if args.cookies else None
+            return run_profiled(
+                lambda: download_all(
+                    links,
+                    VideoStore(args.store),
+                    args.jobs,
+                    max(1, args.fragments),
+                    args.max_connections,
+                    args.limit_rate,
+                    cookies,
+                ),
+                args,
+                METRICS.script,
+            )
+    finally:
+        write_metrics(args.metrics, args.metrics_format)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,114 @@
+"""
+Stage timings and counters shared by all weverse_* scripts.
+
+Code records into the process-wide METRICS object:
+
+    with METRICS.stage("yt_dlp"):
+        ...
+    METRICS.incr("pages")
+
+and each script's main() calls write_metrics() at exit when --metrics is given,
+emitting one JSON line per run or a Prometheus textfile (node_exporter textfile collector).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class Metrics:
+    def __init__(self, script: str = ""):
+        self.script = script
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = {}  # stage -> [count, total_seconds, max_seconds]
+        self.counters: Dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            t = self.timings.setdefault(stage, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += seconds
+            t[2] = max(t[2], seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def incr(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_record(self) -> dict:
+        with self._lock:
+            return {
+                "ts": time.time(),
+                "script": self.script,
+                "wall_seconds": round(time.time() - self.started, 6),
+                "stages": {
+                    name: {"count": c, "total_seconds": round(total, 6), "max_seconds": round(mx, 6)}
+                    for name, (c, total, mx) in self.timings.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def write_jsonl(self, path: str) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_record(), ensure_ascii=False) + "\n")
+
+    def write_prometheus(self, path: str) -> None:
+        rec = self.to_record()
+        script = rec["script"]
+        lines = [
+            "# TYPE weverse_stage_seconds_total counter",
+            "# TYPE weverse_stage_runs_total counter",
+            "# TYPE weverse_stage_seconds_max gauge",
+            "# TYPE weverse_events_total counter",
+            "# TYPE weverse_run_wall_seconds gauge",
+            "# TYPE weverse_last_run_timestamp_seconds gauge",
+        ]
+        for name, st in sorted(rec["stages"].items()):
+            labels = f'script="{script}",stage="{name}"'
+            lines.append(f"weverse_stage_seconds_total{{{labels}}} {st['total_seconds']}")
+            lines.append(f"weverse_stage_runs_total{{{labels}}} {st['count']}")
+            lines.append(f"weverse_stage_seconds_max{{{labels}}} {st['max_seconds']}")
+        for name, value in sorted(rec["counters"].items()):
+            lines.append(f'weverse_events_total{{script="{script}",name="{name}"}} {value}')
+        lines.append(f'weverse_run_wall_seconds{{script="{script}"}} {rec["wall_seconds"]}')
+        lines.append(f'weverse_last_run_timestamp_seconds{{script="{script}"}} {rec["ts"]:.3f}')
+
+        # Write-then-rename so the textfile collector never reads a partial file.
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+
+METRICS = Metrics()
+
+
+def add_metrics_args(ap) -> None:
+    ap.add_argument("--metrics", help="Write stage timings/counters to this file at exit")
+    ap.add_argument(
+        "--metrics-format",
+        choices=["jsonl", "prom"],
+        help="jsonl appends one JSON line per run; prom writes a Prometheus textfile (default: by extension)",
+    )
+
+
+def write_metrics(path: Optional[str], fmt: Optional[str] = None) -> None:
+    if not path:
+        return
+    fmt = fmt or ("prom" if path.endswith(".prom") else "jsonl")
+    if fmt == "prom":
+        METRICS.write_prometheus(path)
+    else:
+        METRICS.write_jsonl(path)
+    print(f"Metrics written to {path}")
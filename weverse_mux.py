@@ -0,0 +1,202 @@
+"""
+Mux subtitles into downloaded lives, or burn them in.
+
+    python weverse_mux.py "[ENG SUB] 250101_2000 STAYC Weverse LIVE/[ENG SUB] 250101_2000 STAYC Weverse LIVE.mp4"
+    python weverse_mux.py videos/*.mp4 --jobs 4
+    python weverse_mux.py live.mp4 --ass weverse_twitch_chat.ass --burn --preset veryfast
+
+Subtitles are picked up next to each video (<stem>.srt from WhisperX, <stem>.ass
+or <stem>_chat.ass from weverse_chat_to_ass_twitch) unless given explicitly.
+
+Soft mode adds them as subtitle tracks with stream copy, so it takes seconds and
+never touches the video. MKV keeps ASS styling as-is; MP4 only carries mov_text,
+so ASS there loses its positioning and colors. Burn mode re-encodes with libx264,
+drawing the ASS (or the SRT when there is no ASS) into the picture.
+"""
+
+import argparse
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from weverse_metrics import METRICS, add_metrics_args, write_metrics
+from weverse_profile import add_profile_args, run_profiled
+
+
+@dataclass
+class MuxJob:
+    video: str
+    out: str
+    srt: Optional[str] = None
+    ass: Optional[str] = None
+    fonts: List[str] = field(default_factory=list)
+
+
+def find_subtitles(video: str) -> Tuple[Optional[str], Optional[str]]:
+    """(srt, ass) sitting next to video, or None for each that is missing."""
+    stem = os.path.splitext(video)[0]
+    srt = stem + ".srt"
+    ass = next((p for p in (stem + ".ass", stem + "_chat.ass") if os.path.exists(p)), None)
+    return (srt if os.path.exists(srt) else None), ass
+
+
+def default_output(video: str, container: str, burn: bool) -> str:
+    stem = os.path.splitext(video)[0]
+    return f"{stem}.{'burned' if burn else 'subbed'}.{container}"
+
+
+def ffmpeg_filter_path(path: str) -> str:
+    """Escape a path for use as a filter option inside an -vf filtergraph (both escaping levels)."""
+    path = path.replace("\\", "/")
+    for ch in "\\:'":
+        path = path.replace(ch, "\\" + ch)
+    escaped = ""
+    for ch in path:
+        escaped += "\\" + ch if ch in "\\'[],;" else ch
+    return escaped
+
+
+def soft_mux_command(job: MuxJob, language: str) -> List[str]:
+    mkv = job.out.lower().endswith(".mkv")
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", job.video]
+    tracks = []  # (title, codec)
+    if job.srt:
+        cmd += ["-i", job.srt]
+        tracks.append(("WhisperX", "srt" if mkv else "mov_text"))
+    if job.ass:
+        cmd += ["-i", job.ass]
+        tracks.append(("Chat", "ass" if mkv else "mov_text"))
+
+    cmd += ["-map", "0:v", "-map", "0:a?"]
+    for i in range(len(tracks)):
+        cmd += ["-map", str(i + 1)]
+    cmd += ["-c:v", "copy", "-c:a", "copy"]
+    for i, (title, codec) in enumerate(tracks):
+        cmd += [f"-c:s:{i}", codec, f"-metadata:s:s:{i}", f"language={language}", f"-metadata:s:s:{i}", f"title={title}"]
+    if tracks:
+        cmd += ["-disposition:s:0", "default"]
+
+    if mkv:
+        # The chat ASS references fonts by name; attach them so players don't fall back.
+        for i, font in enumerate(job.fonts):
+            cmd += ["-attach", font, f"-metadata:s:t:{i}", "mimetype=application/x-truetype-font"]
+    else:
+        cmd += ["-movflags", "+faststart"]
+    cmd.append(job.out)
+    return cmd
+
+
+def burn_command(job: MuxJob, preset: str, crf: int, threads: int, fonts_dir: Optional[str]) -> List[str]:
+    sub = job.ass or job.srt
+    vf = f"subtitles={ffmpeg_filter_path(os.path.abspath(sub))}"
+    if fonts_dir:
+        vf += f":fontsdir={ffmpeg_filter_path(os.path.abspath(fonts_dir))}"
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", job.video, "-vf", vf]
+    cmd += ["-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-c:a", "copy"]
+    if threads > 0:
+        cmd += ["-threads", str(threads), "-filter_threads", str(threads)]
+    if job.out.lower().endswith(".mp4"):
+        cmd += ["-movflags", "+faststart"]
+    cmd.append(job.out)
+    return cmd
+
+
+def run_job(job: MuxJob, args: argparse.Namespace, threads: int) -> bool:
+    if not job.srt and not job.ass:
+        print(f"No subtitles found for {job.video}; skipping.")
+        METRICS.incr("mux_skipped")
+        return False
+
+    if args.burn:
+        cmd = burn_command(job, args.preset, args.crf, threads, args.fonts_dir)
+        stage = "burn_in"
+    else:
+        cmd = soft_mux_command(job, args.language)
+        stage = "mux"
+
+    print(f"{stage}: {job.video} -> {job.out}")
+    with METRICS.stage(stage):
+        result = subprocess.run(cmd)
+    if result.returncode != 0:
+        METRICS.incr("mux_failures")
+        print(f"ffmpeg failed ({result.returncode}) for {job.video}")
+        return False
+    METRICS.incr("muxed")
+    return True
+
+
+def build_jobs(args: argparse.Namespace) -> List[MuxJob]:
+    if len(args.videos) > 1 and (args.out or args.srt or args.ass):
+        raise SystemExit("--out/--srt/--ass only apply to a single video.")
+
+    jobs = []
+    for video in args.videos:
+        srt, ass = find_subtitles(video)
+        container = args.format or os.path.splitext(video)[1].lstrip(".").lower() or "mkv"
+        if not args.burn and not args.format and (args.ass or ass):
+            container = "mkv"  # keep ASS styling unless MP4 was asked for explicitly
+        jobs.append(
+            MuxJob(
+                video=video,
+                out=args.out or default_output(video, container, args.burn),
+                srt=None if args.no_srt else (args.srt or srt),
+                ass=None if args.no_ass else (args.ass or ass),
+                fonts=args.attach_font or [],
+            )
+        )
+    return jobs
+
+
+def mux_batch(args: argparse.Namespace) -> int:
+    jobs = build_jobs(args)
+    workers = max(1, min(args.jobs, len(jobs)))
+    # Burn-in is CPU bound: split the cores between concurrent encodes instead of oversubscribing.
+    threads = args.threads or (max(1, (os.cpu_count() or 1) // workers) if args.burn else 0)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda j: run_job(j, args, threads), jobs))
+
+    done = sum(results)
+    print(f"Muxed {done}/{len(jobs)} videos.")
+    return 0 if done == len(jobs) else 1
+
+
+def add_mux_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--burn", action="store_true", help="Re-encode with subtitles drawn into the video instead of soft tracks")
+    ap.add_argument("--format", choices=["mkv", "mp4"], help="Output container (default: mkv when there is ASS, else the input's)")
+    ap.add_argument("--language", default="eng", help="Language tag for soft subtitle tracks")
+    ap.add_argument("--attach-font", action="append", help="Font file to attach to MKV output (repeatable)")
+    ap.add_argument("--preset", default="veryfast", help="libx264 preset for --burn")
+    ap.add_argument("--crf", type=int, default=20, help="libx264 CRF for --burn")
+    ap.add_argument("--threads", type=int, default=0, help="Encoder threads per job for --burn (default: cores / jobs)")
+    ap.add_argument("--fonts-dir", help="Fonts directory for --burn (e.g. where Nanum Gothic is installed)")
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Mux or burn subtitles into downloaded Weverse lives.")
+    ap.add_argument("videos", nargs="+", help="Video files")
+    ap.add_argument("--srt", help="Subtitle SRT (default: <video stem>.srt)")
+    ap.add_argument("--ass", help="Chat ASS (default: <video stem>.ass or <video stem>_chat.ass)")
+    ap.add_argument("--no-srt", action="store_true", help="Ignore the SRT next to the video")
+    ap.add_argument("--no-ass", action="store_true", help="Ignore the ASS next to the video")
+    ap.add_argument("--out", help="Output path (single video only)")
+    ap.add_argument("--jobs", type=int, default=2, help="Videos processed in parallel")
+    add_mux_args(ap)
+    add_metrics_args(ap)
+    add_profile_args(ap)
+    return ap.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    METRICS.script = "weverse_mux"
+    try:
+        return run_profiled(lambda: mux_batch(args), args, METRICS.script)
+    finally:
+        write_metrics(args.metrics, args.metrics_format)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,396 @@
+"""
+One entry point for the whole workflow, run as a dependency graph per video.
+
+    python weverse_pipeline.py cookie.txt --group-url https://weverse.io/stayc/live
+    python weverse_pipeline.py cookie.txt --links video_links.txt --stages metadata,download,transcribe
+    python weverse_pipeline.py cookie.txt --url https://weverse.io/stayc/live/4-155893737 --limit transcribe=2
+
+Per video (all files under the video store entry, see weverse_store.py):
+
+    metadata ─────────────────────────────┐
+    download ──> transcribe ──────────────┼──> publish ──> mux
+    chat ──────> render ─ ─ ─ ─ ─ ─ ─ ─ ─ ┘   (optional: publish goes ahead without chat)
+
+Stages of different videos, and independent stages of the same video, run at the
+same time; each stage draws from a resource pool (browser, network, whisper, cpu,
+io) whose size is set with --limit. A stage whose outputs exist and are newer than
+its inputs is skipped, so rerunning the pipeline only does the missing work
+(--force redoes it).
+"""
+
+import argparse
+import os
+import queue
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from weverse_metrics import METRICS, add_metrics_args, write_metrics
+from weverse_profile import add_profile_args, run_profiled
+from weverse_ratelimit import add_ratelimit_args, configure_scheduler
+from weverse_session import add_session_args
+from weverse_store import VideoStore, link_or_copy, video_id_from_url
+
+DEFAULT_LIMITS = {"browser": 2, "network": 2, "whisper": 1, "cpu": 2, "io": 4}
+STAGE_POOLS = {
+    "metadata": "browser",
+    "download": "network",
+    "transcribe": "whisper",
+    "chat": "browser",
+    "render": "cpu",
+    "publish": "io",
+    "mux": "cpu",
+}
+
+
+@dataclass
+class VideoJob:
+    url: str
+    video_id: str
+    entry: str  # store directory of this video
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.entry, name)
+
+
+@dataclass
+class Stage:
+    name: str
+    resource: str
+    deps: List[str]
+    outputs: Callable[[VideoJob], List[str]]
+    run: Callable[[VideoJob], None]
+    inputs: Callable[[VideoJob], List[str]] = field(default=lambda job: [])
+    # Waited for, but their failure does not block this stage (optional inputs).
+    soft_deps: List[str] = field(default_factory=list)
+
+
+def up_to_date(outputs: List[str], inputs: List[str]) -> bool:
+    """All outputs exist and none is older than an existing input."""
+    if not outputs or not all(os.path.exists(p) for p in outputs):
+        return False
+    existing = [p for p in inputs if os.path.exists(p)]
+    if not existing:
+        return True
+    return min(os.path.getmtime(p) for p in outputs) >= max(os.path.getmtime(p) for p in existing)
+
+
+# ---------- scheduler ----------
+class Pipeline:
+    """Runs (video, stage) tasks as soon as their dependencies are done and their resource has a free slot."""
+
+    def __init__(self, stages: List[Stage], limits: Dict[str, int], force: bool = False):
+        self.stages = {s.name: s for s in stages}
+        self.order = [s.name for s in stages]
+        self.limits = limits
+        self.force = force
+
+    def run(self, jobs: List[VideoJob]) -> Dict[str, int]:
+        pending: List[Tuple[VideoJob, str]] = [(job, name) for job in jobs for name in self.order]
+        done: Set[Tuple[str, str]] = set()
+        failed: Set[Tuple[str, str]] = set()
+        running: Dict = {}
+        busy = {r: 0 for r in self.limits}
+        counts = {"ran": 0, "skipped": 0, "failed": 0, "blocked": 0}
+
+        with ThreadPoolExecutor(max_workers=max(1, sum(self.limits.values()))) as pool:
+            while pending or running:
+                for task in list(pending):
+                    job, name = task
+                    stage = self.stages[name]
+                    deps = [(job.video_id, d) for d in stage.deps if d in self.stages]
+                    if any(d in failed for d in deps):
+                        pending.remove(task)
+                        failed.add((job.video_id, name))
+                        counts["blocked"] += 1
+                        print(f"[{job.video_id}] {name}: skipped, a dependency failed")
+                        continue
+                    if not all(d in done for d in deps):
+                        continue
+                    soft = [(job.video_id, d) for d in stage.soft_deps if d in self.stages]
+                    if not all(d in done or d in failed for d in soft):
+                        continue
+                    if not self.force and up_to_date(stage.outputs(job), stage.inputs(job)):
+                        pending.remove(task)
+                        done.add((job.video_id, name))
+                        counts["skipped"] += 1
+                        METRICS.incr("stages_up_to_date")
+                        continue
+                    if busy[stage.resource] >= self.limits[stage.resource]:
+                        continue
+                    pending.remove(task)
+                    busy[stage.resource] += 1
+                    running[pool.submit(self._run_stage, stage, job)] = (job, stage)
+
+                if not running:
+                    continue
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    job, stage = running.pop(fut)
+                    busy[stage.resource] -= 1
+                    key = (job.video_id, stage.name)
+                    if fut.result():
+                        done.add(key)
+                        counts["ran"] += 1
+                    else:
+                        failed.add(key)
+                        counts["failed"] += 1
+        return counts
+
+    @staticmethod
+    def _run_stage(stage: Stage, job: VideoJob) -> bool:
+        print(f"[{job.video_id}] {stage.name}: start")
+        t0 = time.perf_counter()
+        try:
+            with METRICS.stage(f"pipeline_{stage.name}"):
+                stage.run(job)
+            missing = [p for p in stage.outputs(job) if not os.path.exists(p)]
+            if missing:
+                raise RuntimeError(f"missing outputs: {', '.join(missing)}")
+        except (Exception, SystemExit) as e:
+            print(f"[{job.video_id}] {stage.name}: failed ({e})")
+            return False
+        print(f"[{job.video_id}] {stage.name}: done in {time.perf_counter() - t0:.1f}s")
+        return True
+
+
+# ---------- stages ----------
+def build_stages(args: argparse.Namespace, store: VideoStore, ytdlp_cookies: Optional[str]) -> List[Stage]:
+    # Imported here so --help and the scheduler work without selenium installed.
+    from weverse_chat_dump import dump_chat
+    from weverse_chat_to_ass_twitch import parse_args as ass_parse_args, render
+    from weverse_dlt import extract_video_info, output_folder_name, video_info_record
+    from weverse_download import download
+    from weverse_mux import MuxJob, default_output, run_job
+    from weverse_transcribe import transcribe
+
+    # A Chrome profile can only be open in one browser, so each browser slot gets its own.
+    profiles: "queue.Queue[Optional[str]]" = queue.Queue()
+    for i in range(args.limits["browser"]):
+        profiles.put(browser_profile_dir(args, i))
+
+    @contextmanager
+    def browser_profile() -> Iterator[Optional[str]]:
+        profile = profiles.get()
+        try:
+            yield profile
+        finally:
+            profiles.put(profile)
+
+    def info_path(job):
+        return [job.path("info.json")]
+
+    def video(job):
+        return [job.path("video.mp4")]
+
+    def srt(job):
+        return [job.path("video.srt")]
+
+    def chat(job):
+        return [job.path("chat.json")]
+
+    def ass(job):
+        return [job.path("chat.ass")]
+
+    def run_metadata(job):
+        with browser_profile() as profile:
+            artist, group, date, title = extract_video_info(job.url, args.cookie_file, profile, lite=args.lite)
+        store.save_info(job.video_id, video_info_record(job.url, artist, group, date, title))
+
+    def run_download(job):
+        # Downloads run side by side, so each gets an equal share of the bandwidth cap.
+        rate = args.limit_rate // max(1, args.limits["network"]) if args.limit_rate else 0
+        if not download(job.url, video(job)[0], args.fragments, rate, cookies=ytdlp_cookies):
+            raise RuntimeError("yt-dlp failed")
+
+    def run_transcribe(job):
+        if transcribe(video(job)[0], job.entry, vad=args.vad, shards=args.shards) is None:
+            raise RuntimeError("WhisperX failed")
+
+    def run_chat(job):
+        with browser_profile() as profile:
+            dump_chat(args.cookie_file, job.url, chat(job)[0], user_data_dir=profile, lite=args.lite)
+
+    def run_render(job):
+        ass_args = ass_parse_args(["--chat", chat(job)[0], "--ass", ass(job)[0], "--auto-offset"] + args.ass_arg)
+        render(ass_args)
+
+    def published(job):
+        info = store.load_info(job.video_id)
+        if not info:
+            return []
+        folder = output_folder_name(info["artist"], info["date"])
+        base = os.path.join(folder, folder)
+        outs = [base + ".mp4", base + "_title.txt"]
+        if os.path.exists(srt(job)[0]):
+            outs.append(base + ".srt")
+        if os.path.exists(ass(job)[0]):
+            outs.append(base + "_chat.ass")
+        return outs
+
+    def run_publish(job):
+        info = store.load_info(job.video_id)
+        base = published(job)[0][: -len(".mp4")]
+        link_or_copy(video(job)[0], base + ".mp4")
+        for src, suffix in ((srt(job)[0], ".srt"), (ass(job)[0], "_chat.ass")):
+            if os.path.exists(src):
+                link_or_copy(src, base + suffix)
+        with open(base + "_title.txt", "w", encoding="utf-8") as f:
+            f.write(info["title"])
+
+    def muxed(job):
+        outs = published(job)
+        return [default_output(outs[0], "mkv", False)] if outs else []
+
+    def run_mux(job):
+        video_path = published(job)[0]
+        srt_path, ass_path = video_path[:-4] + ".srt", video_path[:-4] + "_chat.ass"
+        mux_job = MuxJob(
+            video=video_path,
+            out=muxed(job)[0],
+            srt=srt_path if os.path.exists(srt_path) else None,
+            ass=ass_path if os.path.exists(ass_path) else None,
+        )
+        mux_args = argparse.Namespace(burn=False, language="eng", preset="veryfast", crf=20, fonts_dir=None)
+        if not run_job(mux_job, mux_args, 0):
+            raise RuntimeError("ffmpeg failed")
+
+    stages = [
+        Stage("metadata", STAGE_POOLS["metadata"], [], info_path, run_metadata),
+        Stage("download", STAGE_POOLS["download"], [], video, run_download),
+        Stage("transcribe", STAGE_POOLS["transcribe"], ["download"], srt, run_transcribe, inputs=video),
+        Stage("chat", STAGE_POOLS["chat"], [], chat, run_chat),
+        Stage("render", STAGE_POOLS["render"], ["chat"], ass, run_render, inputs=chat),
+        Stage(
+            "publish",
+            STAGE_POOLS["publish"],
+            ["metadata", "download", "transcribe"],
+            published,
+            run_publish,
+            inputs=lambda job: info_path(job) + video(job) + srt(job) + ass(job),
+            # Lives without a chat dump are published without the chat subtitles.
+            soft_deps=["render"],
+        ),
+        Stage("mux", STAGE_POOLS["mux"], ["publish"], muxed, run_mux, inputs=lambda job: published(job)),
+    ]
+    return [s for s in stages if s.name in args.stages]
+
+
+ALL_STAGES = ["metadata", "download", "transcribe", "chat", "render", "publish", "mux"]
+DEFAULT_STAGES = ["metadata", "download", "transcribe", "chat", "render", "publish"]
+
+
+def browser_profile_dir(args: argparse.Namespace, slot: int) -> Optional[str]:
+    """Chrome profile of browser pool slot `slot` under --user-data-dir (None without it)."""
+    return os.path.join(args.user_data_dir, f"browser-{slot}") if args.user_data_dir else None
+
+
+def parse_limits(items: List[str]) -> Dict[str, int]:
+    limits = dict(DEFAULT_LIMITS)
+    for item in items or []:
+        name, _, value = item.partition("=")
+        # Stage names are accepted too and set the pool that stage draws from.
+        pool = STAGE_POOLS.get(name, name)
+        if pool not in limits or not value.isdigit() or int(value) < 1:
+            raise SystemExit(f"Bad --limit {item!r}; use one of {', '.join(limits)} (or a stage name)=N")
+        limits[pool] = int(value)
+    return limits
+
+
+def parse_args():
+    from weverse_download import parse_rate
+
+    ap = argparse.ArgumentParser(description="Run scrape -> metadata/download/transcribe/chat/render -> publish for many lives.")
+    ap.add_argument("cookie_file", help="Cookies txt path")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--group-url", help="Scrape this live list first, e.g. https://weverse.io/stayc/live")
+    src.add_argument("--links", help="File with one video URL per line")
+    src.add_argument("--url", nargs="+", help="Video URLs")
+    ap.add_argument("--store", default="weverse_store", help="Video store directory")
+    ap.add_argument("--stages", default=",".join(DEFAULT_STAGES), help=f"Comma-separated subset of {','.join(ALL_STAGES)}")
+    ap.add_argument(
+        "--limit",
+        action="append",
+        help="Pool size, e.g. browser=3, network=2, whisper=1, cpu=2, or by stage name like transcribe=2 (repeatable)",
+    )
+    ap.add_argument("--force", action="store_true", help="Rerun stages even when their outputs are up to date")
+    ap.add_argument("--fragments", type=int, default=4, help="Concurrent HLS fragments per download")
+    ap.add_argument("--limit-rate", type=parse_rate, default=0, help="Total bandwidth cap across downloads, e.g. 40M")
+    ap.add_argument("--vad", action="store_true", help="Transcribe speech only (see weverse_transcribe.py)")
+    ap.add_argument("--shards", type=int, default=1, help="Parallel WhisperX shards per video")
+    ap.add_argument("--lite", action="store_true", help="Lightweight browser profile for metadata/chat/scrape")
+    ap.add_argument("--ass-arg", action="append", default=[], help="Extra weverse_chat_to_ass_twitch argument (repeatable), e.g. --ass-arg=--coalesce")
+    add_session_args(ap)
+    add_ratelimit_args(ap)
+    add_metrics_args(ap)
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    args.stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(args.stages) - set(ALL_STAGES)
+    if unknown:
+        ap.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    args.limits = parse_limits(args.limit)
+    return args
+
+
+def collect_links(args: argparse.Namespace) -> List[str]:
+    if args.group_url:
+        from weverse_scrape import get_video_links, save_links_to_file
+
+        with METRICS.stage("pipeline_scrape"):
+            links = get_video_links(args.group_url, args.cookie_file, user_data_dir=browser_profile_dir(args, 0), lite=args.lite)
+        save_links_to_file(links)
+        return links
+    if args.links:
+        with open(args.links, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    return args.url
+
+
+def run(args: argparse.Namespace) -> int:
+    from weverse_session import check_cookie_file, write_netscape_cookies
+
+    check_cookie_file(args.cookie_file)
+    store = VideoStore(args.store)
+    jobs: List[VideoJob] = []
+    seen = set()
+    for url in collect_links(args):
+        video_id = video_id_from_url(url)
+        if video_id not in seen:
+            seen.add(video_id)
+            jobs.append(VideoJob(url, video_id, store.entry_dir(video_id, create=True)))
+    if not jobs:
+        print("No video links found.")
+        return 1
+
+    print(f"{len(jobs)} videos, stages: {', '.join(args.stages)}, pools: {args.limits}")
+    with tempfile.TemporaryDirectory(prefix="weverse_pipeline_") as tmp:
+        ytdlp_cookies = write_netscape_cookies(args.cookie_file, os.path.join(tmp, "cookies.txt"))
+        pipeline = Pipeline(build_stages(args, store, ytdlp_cookies), args.limits, args.force)
+        counts = pipeline.run(jobs)
+
+    for name, n in counts.items():
+        METRICS.incr(f"stages_{name}", n)
+    print(
+        f"Stages run: {counts['ran']}, up to date: {counts['skipped']}, "
+        f"failed: {counts['failed']}, not run after a failure: {counts['blocked']}"
+    )
+    return 1 if counts["failed"] else 0
+
+
+def main() -> int:
+    args = parse_args()
+    METRICS.script = "weverse_pipeline"
+    configure_scheduler(args)
+    try:
+        return run_profiled(lambda: run(args), args, METRICS.script)
+    finally:
+        write_metrics(args.metrics, args.metrics_format)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
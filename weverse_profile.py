@@ -0,0 +1,148 @@
+"""
+--profile support for the weverse_* entry points, plus a summary helper.
+
+    python weverse_chat_to_ass_twitch.py --chat c.json --ass c.ass --profile
+    python weverse_chat_dump.py ... --profile dump.collapsed --profile-mode sample
+    python weverse_profile.py profile_weverse_chat_to_ass_twitch_20250101_120000.pstats --top 15
+
+cprofile mode writes a pstats file (deterministic, higher overhead). sample mode
+walks every thread's stack at a fixed interval and writes collapsed stacks
+("a;b;c count" lines) that flamegraph.pl / speedscope read directly.
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Callable
+
+
+def add_profile_args(ap) -> None:
+    ap.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        help="Profile this run; optional output path (default: profile_<script>_<timestamp>.<ext>)",
+    )
+    ap.add_argument(
+        "--profile-mode",
+        choices=["cprofile", "sample"],
+        default="cprofile",
+        help="cprofile writes pstats; sample writes collapsed stacks with low overhead",
+    )
+    ap.add_argument("--profile-interval", type=float, default=0.005, help="Sampling interval in seconds")
+
+
+class StackSampler:
+    """Periodically records the stacks of all other threads as collapsed strings."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.counts[";".join(reversed(names))] += 1
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self.counts.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+def default_profile_path(script: str, mode: str) -> str:
+    ext = "collapsed" if mode == "sample" else "pstats"
+    return f"profile_{script}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+
+
+def run_profiled(fn: Callable[[], object], args, script: str):
+    """Run fn() under the profiler selected by args.profile / args.profile_mode (no-op when unset)."""
+    if args.profile is None:
+        return fn()
+
+    path = args.profile or default_profile_path(script, args.profile_mode)
+    if args.profile_mode == "sample":
+        sampler = StackSampler(args.profile_interval)
+        sampler.start()
+        try:
+            return fn()
+        finally:
+            sampler.stop()
+            sampler.write(path)
+            print(f"Profile ({sum(sampler.counts.values())} samples) written to {path}")
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}")
+
+
+def summarize_pstats(path: str, top: int, sort: str) -> None:
+    stats = pstats.Stats(path)
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+
+
+def summarize_collapsed(path: str, top: int) -> None:
+    self_counts = Counter()
+    total_counts = Counter()
+    total = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stack, _, n = line.rstrip("\n").rpartition(" ")
+            if not stack:
+                continue
+            n = int(n)
+            total += n
+            frames = stack.split(";")
+            self_counts[frames[-1]] += n
+            for fr in set(frames):
+                total_counts[fr] += n
+
+    print(f"{total} samples")
+    print(f"{'self%':>7} {'total%':>7}  function")
+    for fr, n in self_counts.most_common(top):
+        print(f"{100 * n / total:>6.1f}% {100 * total_counts[fr] / total:>6.1f}%  {fr}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Summarize a --profile output file.")
+    ap.add_argument("path", help=".pstats or .collapsed file")
+    ap.add_argument("--top", type=int, default=20, help="Number of hot functions to show")
+    ap.add_argument("--sort", default="tottime", help="pstats sort key (tottime, cumulative, ncalls, ...)")
+    args = ap.parse_args()
+
+    if args.path.endswith(".collapsed"):
+        summarize_collapsed(args.path, args.top)
+    else:
+        summarize_pstats(args.path, args.top, args.sort)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+"""
+Central request scheduler: per-host rate limits, retries and circuit breaking.
+
+    SCHEDULER.call(url, lambda: driver.get(url), retry_on=(WebDriverException,))
+    body, enc = await SCHEDULER.call_async(url, lambda: http.get(url, headers))
+
+For every host:
+  - a token bucket spaces requests to --request-rate per second (bursts of --burst)
+  - HTTP 429/5xx, timeouts and connection errors are retried up to --retries times
+    with exponential backoff and full jitter; Retry-After is honoured and pauses
+    the whole host, not just the request that got it
+  - after --breaker-threshold failures in a row the host's circuit opens: calls
+    fail fast with CircuitOpenError for --breaker-cooldown seconds, then a single
+    trial request decides whether it closes again
+
+SCHEDULER is shared by every thread and event loop in the process, so parallel
+browsers and window pagers draw from the same per-host budget.
+"""
+
+import asyncio
+import random
+import threading
+import time
+import urllib.error
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+from weverse_async import HTTPStatusError, aiohttp
+from weverse_metrics import METRICS
+
+T = TypeVar("T")
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS: Tuple[type, ...] = (urllib.error.URLError, ConnectionError, TimeoutError)
+if aiohttp is not None:
+    TRANSIENT_ERRORS += (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).hostname or url
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), if the error carries one."""
+    if not isinstance(exc, HTTPStatusError):
+        return None
+    value = next((v for k, v in exc.headers.items() if k.lower() == "retry-after"), None)
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------- per-host state ----------
+class TokenBucket:
+    """Reservation-based bucket: reserve() returns how long the caller must wait for its token."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.rate <= 0:
+                return wait
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            # Negative tokens are requests already queued behind this bucket.
+            return max(wait, -self.tokens / self.rate if self.tokens < 0 else 0.0)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.trial = True  # half-open: let one request through
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; True when this opened (or re-opened) the circuit."""
+        with self._lock:
+            self.failures += 1
+            if self.trial or (self.threshold > 0 and self.failures >= self.threshold and self.opened_at is None):
+                self.opened_at = time.monotonic()
+                self.trial = False
+                return True
+            return False
+
+
+@dataclass
+class HostState:
+    bucket: TokenBucket
+    breaker: CircuitBreaker
+
+
+# ---------- scheduler ----------
+@dataclass
+class RequestScheduler:
+    rate: float = 8.0
+    burst: int = 16
+    retries: int = 5
+    backoff_base: float = 1.0
+    backoff_cap: float = 60.0
+    breaker_threshold: int = 8
+    breaker_cooldown: float = 60.0
+    hosts: Dict[str, HostState] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def host(self, url: str) -> HostState:
+        name = host_of(url)
+        with self._lock:
+            state = self.hosts.get(name)
+            if state is None:
+                state = self.hosts[name] = HostState(
+                    TokenBucket(self.rate, self.burst),
+                    CircuitBreaker(self.breaker_threshold, self.breaker_cooldown),
+                )
+            return state
+
+    def _admit(self, url: str, state: HostState) -> float:
+        if not state.breaker.allow():
+            METRICS.incr("circuit_rejected")
+            raise CircuitOpenError(f"{host_of(url)}: too many failures, pausing requests for {self.breaker_cooldown:.0f}s")
+        return state.bucket.reserve()
+
+    def _retry_delay(self, url: str, state: HostState, exc: Exception, attempt: int, retry_on: tuple) -> float:
+        """Backoff before the next attempt; re-raises `exc` when it should not be retried."""
+        transient = isinstance(exc, TRANSIENT_ERRORS + retry_on) or (
+            isinstance(exc, HTTPStatusError) and exc.status in RETRY_STATUSES
+        )
+        if not transient:
+            state.breaker.record_success()  # the host answered; the request itself is bad
+            raise exc
+        if state.breaker.record_failure():
+            METRICS.incr("circuit_opened")
+            print(f"{host_of(url)}: circuit opened after {state.breaker.failures} failures")
+            raise exc
+        if attempt >= self.retries:
+            raise exc
+
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        hint = retry_after(exc)
+        if hint is not None:
+            delay = max(delay, min(hint, self.backoff_cap))
+            state.bucket.pause(delay)
+        METRICS.incr("request_retries")
+        print(f"{host_of(url)}: {exc}; retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+        return delay
+
+    def call(self, url: str, fn: Callable[[], T], retry_on: tuple = ()) -> T:
+        state = self.host(url)
+        attempt = 0
+        while True:
+            time.sleep(self._admit(url, state))
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._retry_delay(url, state, e, attempt, retry_on))
+                attempt += 1
+                continue
+            state.breaker.record_success()
+            return result
+
+    async def call_async(self, url: str, fn: Callable[[], Awaitable[T]], retry_on: tuple = ()) -> T:
+        state = self.host(url)
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._admit(url, state))
+            try:
+                result = await fn()
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(url, state, e, attempt, retry_on))
+                attempt += 1
+                continue
+            state.breaker.record_success()
+            return result
+
+
+SCHEDULER = RequestScheduler()
+
+
+def add_ratelimit_args(ap) -> None:
+    ap.add_argument("--request-rate", type=float, default=SCHEDULER.rate, help="Requests per second per host (0 = unlimited)")
+    ap.add_argument("--burst", type=int, default=SCHEDULER.burst, help="Requests per host allowed back to back before --request-rate applies")
+    ap.add_argument("--retries", type=int, default=SCHEDULER.retries, help="Retries for 429/5xx/timeouts, with exponential backoff and jitter")
+    ap.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=SCHEDULER.breaker_threshold,
+        help="Consecutive failures that pause all requests to a host (0 = never)",
+    )
+    ap.add_argument("--breaker-cooldown", type=float, default=SCHEDULER.breaker_cooldown, help="Seconds a paused host waits before a trial request")
+
+
+def configure_scheduler(args) -> RequestScheduler:
+    """Apply the CLI settings to SCHEDULER (before any host has been contacted)."""
+    SCHEDULER.rate = args.request_rate
+    SCHEDULER.burst = args.burst
+    SCHEDULER.retries = args.retries
+    SCHEDULER.breaker_threshold = args.breaker_threshold
+    SCHEDULER.breaker_cooldown = args.breaker_cooldown
+    SCHEDULER.hosts.clear()
+    return SCHEDULER
@@ -1,38 +1,22 @@
+import argparse
 import os
 import sys
 import time
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium import webdriver
 
+from weverse_browser import add_browser_args, apply_lite_options, block_heavy_resources
+from weverse_metrics import METRICS, add_metrics_args, write_metrics
+from weverse_profile import add_profile_args, run_profiled
+from weverse_ratelimit import SCHEDULER, add_ratelimit_args, configure_scheduler
+from weverse_session import add_session_args, authenticate, check_cookie_file, use_user_data_dir
 
-def load_cookies_from_txt(driver, cookie_file):
-    """
-    Reads cookies from a text file (a single semicolon-separated line)
-    and adds them to the current driver session.
-    """
-    with open(cookie_file, "r", encoding="utf-8") as f:
-        cookie_str = f.read().strip()
-    cookies = cookie_str.split(";")
-    for cookie in cookies:
-        cookie = cookie.strip()
-        if not cookie:
-            continue
-        parts = cookie.split("=", 1)
-        if len(parts) != 2:
-            continue
-        name, value = parts
-        # For this example, we assume the cookies belong to "weverse.io"
-        cookie_dict = {"name": name, "value": value, "domain": "weverse.io"}
-        try:
-            driver.add_cookie(cookie_dict)
-        except Exception as e:
-            print(f"Could not add cookie {cookie_dict}: {e}")
-
-
-def get_video_links(target_url, cookie_file, scroll_pause_time=2, headless=True):
+
+def get_video_links(target_url, cookie_file, scroll_pause_time=2, headless=True, user_data_dir=None, lite=False):
     """
     Opens the target URL after loading cookies and scrolls to load all video items.
     Returns a list of video links based on the CSS selector.
@@ -43,29 +27,38 @@ def get_video_links(target_url, cookie_file, scroll_pause_time=2, headless=True)
     options.add_argument(
         "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36"
     )
-    driver = webdriver.Chrome(options=options)
+    use_user_data_dir(options, user_data_dir)
+    if lite:
+        apply_lite_options(options)
+    with METRICS.stage("browser_startup"):
+        driver = webdriver.Chrome(options=options)
+        if lite:
+            block_heavy_resources(driver)
     try:
-        # Open the base domain so cookies can be added.
-        base_url = "https://weverse.io/"
-        driver.get(base_url)
-        load_cookies_from_txt(driver, cookie_file)
-        driver.refresh()
-
-        # Navigate to the target URL.
-        driver.get(target_url)
-        wait = WebDriverWait(driver, 30)
-        wait.until(EC.presence_of_element_located(
-            (By.CSS_SELECTOR, "a.LiveListView_live_item__aX1Ph")))
+        # Log in before the first page load.
+        with METRICS.stage("cookie_bootstrap"):
+            authenticate(driver, cookie_file, user_data_dir)
+
+        # Navigate to the target URL; a page that never shows the list is retried with backoff.
+        def load():
+            driver.get(target_url)
+            wait = WebDriverWait(driver, 30)
+            wait.until(EC.presence_of_element_located(
+                (By.CSS_SELECTOR, "a.LiveListView_live_item__aX1Ph")))
+
+        with METRICS.stage("page_load"):
+            SCHEDULER.call(target_url, load, retry_on=(WebDriverException,))
 
         # Scroll down until no new content loads.
         last_height = driver.execute_script(
             "return document.body.scrollHeight")
         while True:
-            driver.execute_script(
-                "window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(scroll_pause_time)
-            new_height = driver.execute_script(
-                "return document.body.scrollHeight")
+            with METRICS.stage("scroll_round"):
+                driver.execute_script(
+                    "window.scrollTo(0, document.body.scrollHeight);")
+                time.sleep(scroll_pause_time)
+                new_height = driver.execute_script(
+                    "return document.body.scrollHeight")
             if new_height == last_height:
                 break
             last_height = new_height
@@ -83,6 +76,7 @@ def get_video_links(target_url, cookie_file, scroll_pause_time=2, headless=True)
                 print(f"Link {counter}: {href}")
 
         print(f"\nTotal video links found: {counter}")
+        METRICS.incr("links", counter)
         return video_links
     finally:
         driver.quit()
@@ -99,19 +93,35 @@ def save_links_to_file(links, output_file="video_links.txt"):
 
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python weverse_video_links.py <cookie_file> <target_url>")
-        sys.exit(1)
-
-    cookie_file = sys.argv[1]
-    target_url = sys.argv[2]
+    ap = argparse.ArgumentParser(description="Scrape a group's Weverse Live catalog into video_links.txt.")
+    ap.add_argument("cookie_file", help="Cookies txt path")
+    ap.add_argument("target_url", help="Group live list URL, e.g. https://weverse.io/stayc/live")
+    add_session_args(ap)
+    add_browser_args(ap)
+    add_ratelimit_args(ap)
+    add_metrics_args(ap)
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    METRICS.script = "weverse_scrape"
+    configure_scheduler(args)
+    cookie_file = args.cookie_file
+    target_url = args.target_url
 
     if not os.path.exists(cookie_file):
         print(f"Cookie file '{cookie_file}' not found.")
         sys.exit(1)
+    check_cookie_file(cookie_file)
 
     print(f"Scraping video links from {target_url} ...")
-    links = get_video_links(target_url, cookie_file)
+    try:
+        links = run_profiled(
+            lambda: get_video_links(target_url, cookie_file, user_data_dir=args.user_data_dir, lite=args.lite),
+            args,
+            METRICS.script,
+        )
+    finally:
+        write_metrics(args.metrics, args.metrics_format)
 
     if links:
         print("\nFound video links:")
@@ -0,0 +1,190 @@
+"""
+Weverse login session shared by every script: cookie.txt parsing, browser
+authentication, token expiry checks and yt-dlp cookie export.
+
+    check_cookie_file(cookie_file)                     # at startup, before any browser
+    authenticate(driver, cookie_file, user_data_dir)   # instead of get + add_cookie + refresh
+    write_netscape_cookies(cookie_file, path)          # yt-dlp --cookies
+
+Cookies go into the browser through CDP (Network.setCookies), which needs no page
+load, so a job goes straight to its target URL. They are set as persistent cookies
+(expiring with the session tokens), so with --user-data-dir the Chrome profile keeps
+them between runs and injection is skipped while the cookie file is unchanged and the
+profile still holds every cookie. A profile directory can only be used by one browser
+at a time.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from weverse_metrics import METRICS
+
+WEVERSE_URL = "https://weverse.io/"
+COOKIE_DOMAIN = ".weverse.io"
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36"
+)
+SESSION_MARKER = "weverse_session.json"
+EXPIRY_WARNING_SECONDS = 3600
+# Browser cookie lifetime when no cookie is a JWT with an exp claim.
+DEFAULT_COOKIE_LIFETIME = 30 * 86400
+
+
+def read_cookie_file(cookie_file: str) -> Dict[str, str]:
+    """
+    Parses a cookie text file holding a single `document.cookie` string
+    (cookies separated by semicolons).
+    """
+    with open(cookie_file, "r", encoding="utf-8") as f:
+        cookie_str = f.read().strip()
+    cookies = {}
+    for cookie in cookie_str.split(";"):
+        cookie = cookie.strip()
+        if not cookie:
+            continue
+        parts = cookie.split("=", 1)
+        if len(parts) != 2:
+            continue
+        name, value = parts
+        cookies[name.strip()] = value.strip()
+    return cookies
+
+
+# ---------- expiry ----------
+def jwt_expiry(token: str) -> Optional[float]:
+    """`exp` claim of a JWT, or None when the value is not a JWT."""
+    parts = token.split(".")
+    if len(parts) != 3 or not parts[0].startswith("eyJ"):
+        return None
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (ValueError, AttributeError):
+        return None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def session_expiry(cookies: Dict[str, str]) -> Optional[float]:
+    """Latest expiry among the JWT cookies (the refresh token outlives the access token)."""
+    expiries = [exp for exp in (jwt_expiry(v) for v in cookies.values()) if exp]
+    return max(expiries) if expiries else None
+
+
+def check_session(cookies: Dict[str, str]) -> None:
+    exp = session_expiry(cookies)
+    if exp is None:
+        return
+    left = exp - time.time()
+    if left <= 0:
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(exp))
+        raise SystemExit(f"Weverse session expired at {stamp}; export a fresh cookie.txt (document.cookie).")
+    if left < EXPIRY_WARNING_SECONDS:
+        print(f"Warning: Weverse session expires in {left / 60:.0f} minutes.")
+
+
+def check_cookie_file(cookie_file: str) -> None:
+    """Stop before starting any browser or download when cookie.txt has expired."""
+    check_session(read_cookie_file(cookie_file))
+
+
+def cookie_expires(cookies: Dict[str, str]) -> float:
+    return session_expiry(cookies) or time.time() + DEFAULT_COOKIE_LIFETIME
+
+
+# ---------- browser ----------
+def use_user_data_dir(options, user_data_dir: Optional[str]) -> None:
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={os.path.abspath(user_data_dir)}")
+
+
+def cookie_fingerprint(cookies: Dict[str, str]) -> str:
+    return hashlib.sha1(json.dumps(cookies, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_cookies_from_txt(driver, cookie_file):
+    """
+    Loads cookies from a text file and adds them to the current driver session.
+    The driver must already be on a weverse.io page.
+    """
+    cookies = read_cookie_file(cookie_file)
+    expires = int(cookie_expires(cookies))
+    for name, value in cookies.items():
+        cookie_dict = {"name": name, "value": value, "domain": "weverse.io", "expiry": expires}
+        try:
+            driver.add_cookie(cookie_dict)
+        except Exception as e:
+            print(f"Could not add cookie {cookie_dict}: {e}")
+
+
+def profile_has_cookies(driver, cookies: Dict[str, str]) -> bool:
+    """Whether the browser profile still holds every cookie from cookie.txt (no page load needed)."""
+    try:
+        stored = driver.execute_cdp_cmd("Network.getCookies", {"urls": [WEVERSE_URL]}).get("cookies") or []
+    except Exception:
+        return False
+    have = {c.get("name"): c.get("value") for c in stored}
+    return all(have.get(k) == v for k, v in cookies.items())
+
+
+def authenticate(driver, cookie_file: str, user_data_dir: Optional[str] = None) -> None:
+    """Make the browser logged in before its first navigation to Weverse."""
+    cookies = read_cookie_file(cookie_file)
+    check_session(cookies)
+
+    fingerprint = cookie_fingerprint(cookies)
+    marker = os.path.join(user_data_dir, SESSION_MARKER) if user_data_dir else None
+    if marker and os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            same_cookies = json.load(f).get("fingerprint") == fingerprint
+        # The marker only says what was injected; the profile may have dropped it since.
+        if same_cookies and profile_has_cookies(driver, cookies):
+            METRICS.incr("session_reused")
+            return
+
+    expires = int(cookie_expires(cookies))
+    try:
+        driver.execute_cdp_cmd(
+            "Network.setCookies",
+            {
+                "cookies": [
+                    # An expiry makes them persistent; session cookies are not saved in the profile.
+                    {"name": k, "value": v, "domain": COOKIE_DOMAIN, "path": "/", "secure": True, "expires": expires}
+                    for k, v in cookies.items()
+                ]
+            },
+        )
+    except Exception as e:
+        # Non-Chrome drivers: cookies can only be set from a page on the domain.
+        print(f"CDP cookie injection unavailable ({e}); loading weverse.io first.")
+        driver.get(WEVERSE_URL)
+        load_cookies_from_txt(driver, cookie_file)
+        driver.refresh()
+
+    if marker:
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "saved": time.time()}, f)
+
+
+def add_session_args(ap) -> None:
+    ap.add_argument(
+        "--user-data-dir",
+        help="Persistent Chrome profile directory; keeps the login between runs (one browser at a time)",
+    )
+
+
+# ---------- yt-dlp ----------
+def write_netscape_cookies(cookie_file: str, path: str) -> str:
+    """Export the session as a Netscape cookies.txt (yt-dlp --cookies)."""
+    cookies = read_cookie_file(cookie_file)
+    expires = int(cookie_expires(cookies))
+    lines = ["# Netscape HTTP Cookie File"]
+    for name, value in cookies.items():
+        lines.append("\t".join([COOKIE_DOMAIN, "TRUE", "/", "TRUE", str(expires), name, value]))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
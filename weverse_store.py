@@ -0,0 +1,84 @@
+"""
+Content-addressed store for downloaded lives.
+
+Every video lives once under <root>/<video id>/ (video.mp4, video.srt, info.json),
+keyed by the id in its Weverse URL. The human-readable "[ENG SUB] ..." folders get
+hardlinks to those files (a copy when the filesystem can't hardlink), so the same
+live reached through another community page, a repeated URL or a rerun is never
+downloaded, scraped or transcribed twice.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from typing import Optional
+
+VIDEO_ID_RE = re.compile(r"/(?:live|media)/([0-9]+-[0-9]+|[0-9]+)(?:[/?#]|$)")
+
+
+def video_id_from_url(url: str) -> str:
+    """The post id from a Weverse live/media URL, or a stable hash of the URL when there is none."""
+    m = VIDEO_ID_RE.search(url)
+    if m:
+        return m.group(1)
+    return "url-" + hashlib.sha1(url.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def same_file(a: str, b: str) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def link_or_copy(src: str, dst: str) -> str:
+    """Hardlink src to dst, falling back to a copy; returns "link", "copy" or "exists"."""
+    if same_file(src, dst):
+        return "exists"
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        shutil.copy2(src, dst)
+        return "copy"
+
+
+class VideoStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def entry_dir(self, video_id: str, create: bool = False) -> str:
+        """<root>/<video id>; only made on disk with create=True, so lookups leave no empty entries."""
+        path = os.path.join(self.root, video_id)
+        if create:
+            os.makedirs(path, exist_ok=True)
+        return path
+
+    def video_path(self, video_id: str) -> str:
+        return os.path.join(self.entry_dir(video_id), "video.mp4")
+
+    def srt_path(self, video_id: str) -> str:
+        return os.path.join(self.entry_dir(video_id), "video.srt")
+
+    def has_video(self, video_id: str) -> bool:
+        return os.path.exists(self.video_path(video_id))
+
+    def has_srt(self, video_id: str) -> bool:
+        return os.path.exists(self.srt_path(video_id))
+
+    def load_info(self, video_id: str) -> Optional[dict]:
+        path = os.path.join(self.entry_dir(video_id), "info.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_info(self, video_id: str, info: dict) -> None:
+        path = os.path.join(self.entry_dir(video_id, create=True), "info.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
@@ -0,0 +1,390 @@
+"""
+WhisperX transcription with an optional speech-only pre-pass.
+
+    python weverse_transcribe.py live.mp4 --out-dir . --vad
+    python weverse_transcribe.py live.mp4 --vad --shards 4
+    python weverse_dlt.py cookie.txt video_links.txt --vad
+
+With --vad the audio is extracted once (16 kHz mono), ffmpeg silencedetect finds the
+quiet stretches (intros, BGM breaks, intermissions), and only the speech spans are
+spliced into a condensed WAV for WhisperX. The SRT cues are then mapped back onto
+the original timeline, so the output lines up with the video as before.
+
+With --shards N the audio is cut at silences into N pieces of similar length, which
+are transcribed by concurrent WhisperX processes and stitched back in order; a line
+repeated on both sides of a cut is kept once.
+"""
+
+import argparse
+import bisect
+import os
+import re
+import subprocess
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from weverse_metrics import METRICS, add_metrics_args, write_metrics
+from weverse_profile import add_profile_args, run_profiled
+
+SAMPLE_RATE = 16000
+SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[0-9.]+)")
+SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[0-9.]+)")
+SRT_TIME_RE = re.compile(r"(\d+):(\d{2}):(\d{2})[,.](\d{3})")
+
+
+# ---------- SRT ----------
+@dataclass
+class Cue:
+    start: float
+    end: float
+    text: str
+
+
+def srt_time(t: float) -> str:
+    ms = int(round(max(0.0, t) * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def parse_srt_time(text: str) -> float:
+    m = SRT_TIME_RE.search(text)
+    if not m:
+        raise ValueError(f"bad SRT time: {text!r}")
+    h, mi, s, ms = (int(g) for g in m.groups())
+    return h * 3600 + mi * 60 + s + ms / 1000.0
+
+
+def read_srt(path: str) -> List[Cue]:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        blocks = re.split(r"\n\s*\n", f.read().replace("\r\n", "\n").strip())
+    cues = []
+    for block in blocks:
+        lines = block.split("\n")
+        arrow = next((i for i, line in enumerate(lines) if "-->" in line), None)
+        if arrow is None:
+            continue
+        start, end = lines[arrow].split("-->")
+        cues.append(Cue(parse_srt_time(start), parse_srt_time(end), "\n".join(lines[arrow + 1 :]).strip()))
+    return cues
+
+
+def write_srt(path: str, cues: List[Cue]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i, cue in enumerate(cues, 1):
+            f.write(f"{i}\n{srt_time(cue.start)} --> {srt_time(cue.end)}\n{cue.text}\n\n")
+
+
+# ---------- speech detection ----------
+def extract_audio(video: str, wav_path: str) -> None:
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", video,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-c:a", "pcm_s16le", wav_path,
+    ]
+    with METRICS.stage("audio_extract"):
+        subprocess.run(cmd, check=True)
+
+
+def wav_duration(wav_path: str) -> float:
+    with wave.open(wav_path, "rb") as w:
+        return w.getnframes() / float(w.getframerate())
+
+
+def parse_silences(ffmpeg_log: str, duration: float) -> List[Tuple[float, float]]:
+    """(start, end) silences from silencedetect stderr; a trailing open silence runs to the end."""
+    silences = []
+    start = None
+    for line in ffmpeg_log.splitlines():
+        m = SILENCE_START_RE.search(line)
+        if m:
+            start = max(0.0, float(m.group(1)))
+            continue
+        m = SILENCE_END_RE.search(line)
+        if m and start is not None:
+            silences.append((start, float(m.group(1))))
+            start = None
+    if start is not None:
+        silences.append((start, duration))
+    return silences
+
+
+def speech_regions(
+    silences: List[Tuple[float, float]],
+    duration: float,
+    pad: float = 0.3,
+    min_speech: float = 0.3,
+) -> List[Tuple[float, float]]:
+    """Complement of the silences, padded on both sides and merged where the padding overlaps."""
+    regions: List[Tuple[float, float]] = []
+    t = 0.0
+    for s_start, s_end in silences + [(duration, duration)]:
+        if s_start - t >= min_speech:
+            a, b = max(0.0, t - pad), min(duration, s_start + pad)
+            if regions and a <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], b)
+            else:
+                regions.append((a, b))
+        t = max(t, s_end)
+    return regions
+
+
+def detect_silences(wav_path: str, noise_db: float = -35.0, min_silence: float = 2.0) -> List[Tuple[float, float]]:
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats", "-i", wav_path,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-",
+    ]
+    with METRICS.stage("vad"):
+        result = subprocess.run(cmd, capture_output=True, text=True, errors="replace")
+    if result.returncode != 0:
+        raise RuntimeError(f"silencedetect failed: {result.stderr[-500:]}")
+    return parse_silences(result.stderr, wav_duration(wav_path))
+
+
+def silence_cut_ranges(silences: List[Tuple[float, float]], duration: float) -> List[Tuple[float, float]]:
+    """The whole timeline as consecutive ranges, cut in the middle of every inner silence."""
+    cuts = [(a + b) / 2 for a, b in silences if a > 0 and b < duration]
+    bounds = [0.0] + cuts + [duration]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def plan_shards(regions: List[Tuple[float, float]], shards: int) -> List[List[Tuple[float, float]]]:
+    """Split consecutive regions into at most `shards` groups of roughly equal audio length."""
+    total = sum(b - a for a, b in regions)
+    target = total / max(1, shards)
+    groups: List[List[Tuple[float, float]]] = [[]]
+    acc = 0.0
+    for region in regions:
+        # Cut before this region if its midpoint already lies past the current shard's share.
+        if groups[-1] and len(groups) < shards and acc + (region[1] - region[0]) / 2 >= target * len(groups):
+            groups.append([])
+        groups[-1].append(region)
+        acc += region[1] - region[0]
+    return [g for g in groups if g]
+
+
+# ---------- condensed audio ----------
+@dataclass
+class Span:
+    packed_start: float  # position in the condensed audio
+    orig_start: float  # position in the original audio
+    duration: float
+
+
+class TimeMap:
+    """Maps times in a condensed (speech-only) audio file back to the original timeline."""
+
+    def __init__(self, spans: List[Span]):
+        self.spans = spans
+        self._starts = [s.packed_start for s in spans]
+
+    def span_index(self, t: float) -> int:
+        return max(0, bisect.bisect_right(self._starts, t) - 1)
+
+    def to_original(self, t: float) -> float:
+        if not self.spans:
+            return t
+        span = self.spans[self.span_index(t)]
+        # Times inside the spacer after a span stick to that span's end.
+        return span.orig_start + min(max(0.0, t - span.packed_start), span.duration)
+
+    def remap(self, cues: List[Cue]) -> List[Cue]:
+        if not self.spans:
+            return list(cues)
+        out = []
+        for cue in cues:
+            i = self.span_index(cue.start)
+            span = self.spans[i]
+            span_end = span.orig_start + span.duration
+            if cue.start - span.packed_start > span.duration:
+                if i + 1 < len(self.spans):
+                    # Starts in the spacer after span i: the words are at the start of the next span.
+                    span = self.spans[i + 1]
+                    span_end = span.orig_start + span.duration
+                    start = span.orig_start
+                else:
+                    # Trailing spacer of the last span: keep the cue's length, ending with the speech.
+                    start = max(span.orig_start, span_end - (cue.end - cue.start))
+            else:
+                start = self.to_original(cue.start)
+            # A cue running over a cut must not stay on screen through the skipped silence.
+            end = min(self.to_original(cue.end), span_end)
+            if end <= start:
+                end = min(start + (cue.end - cue.start), span_end)
+            if end <= start:
+                METRICS.incr("cues_dropped")
+                continue
+            out.append(Cue(start, end, cue.text))
+        return out
+
+
+def write_condensed(wav_path: str, regions: List[Tuple[float, float]], out_path: str, spacer: float = 0.5) -> TimeMap:
+    """Splice the regions of wav_path into out_path, separated by `spacer` seconds of silence."""
+    spans = []
+    with wave.open(wav_path, "rb") as src, wave.open(out_path, "wb") as dst:
+        dst.setparams(src.getparams())
+        rate = src.getframerate()
+        frame_bytes = src.getsampwidth() * src.getnchannels()
+        gap = b"\x00" * (int(spacer * rate) * frame_bytes)
+        packed = 0
+        for a, b in regions:
+            first, last = int(a * rate), min(int(b * rate), src.getnframes())
+            if last <= first:
+                continue
+            src.setpos(first)
+            dst.writeframes(src.readframes(last - first))
+            spans.append(Span(packed / rate, first / rate, (last - first) / rate))
+            packed += last - first
+            dst.writeframes(gap)
+            packed += len(gap) // frame_bytes
+    return TimeMap(spans)
+
+
+# ---------- WhisperX ----------
+def whisperx_command(media: str, out_dir: str, env: str = "whisperx_env", threads: int = 0) -> List[str]:
+    cmd = [
+        "conda", "run", "-n", env, "whisperx",
+        "--language", "ko", "--task", "translate", "--model", "large-v3",
+        "--output_format", "srt", "--compute_type", "float32",
+        "--output_dir", out_dir, "--chunk_size", "5",
+    ]
+    if threads > 0:
+        cmd += ["--threads", str(threads)]
+    cmd.append(media)
+    return cmd
+
+
+def run_whisperx(media: str, out_dir: str, threads: int = 0) -> Optional[str]:
+    """Run WhisperX on media; returns the SRT it wrote or None on failure."""
+    cmd = whisperx_command(media, out_dir, threads=threads)
+    print("Executing translation command:", " ".join(cmd))
+    with METRICS.stage("whisperx"):
+        result = subprocess.run(cmd)
+    srt = os.path.join(out_dir, os.path.splitext(os.path.basename(media))[0] + ".srt")
+    if result.returncode != 0 or not os.path.exists(srt):
+        return None
+    return srt
+
+
+def stitch_cues(parts: List[List[Cue]], tolerance: float = 1.0) -> List[Cue]:
+    """
+    Concatenate per-shard cues (shards in time order). Only the last cue of one shard and
+    the first of the next are compared: a line heard on both sides of the cut is kept once.
+    """
+    out: List[Cue] = []
+    for part in parts:
+        cues = sorted(part, key=lambda c: c.start)
+        if out and cues:
+            prev, first = out[-1], cues[0]
+            if first.text.strip() == prev.text.strip() and first.start <= prev.end + tolerance:
+                prev.end = max(prev.end, first.end)
+                METRICS.incr("boundary_duplicates")
+                cues = cues[1:]
+        out.extend(cues)
+    return out
+
+
+def transcribe_shards(wav: str, groups: List[List[Tuple[float, float]]], tmp: str, threads: int = 0) -> Optional[List[Cue]]:
+    """Condense each group of regions into its own WAV and run WhisperX on all of them at once."""
+    jobs = []
+    for i, group in enumerate(groups):
+        shard_wav = os.path.join(tmp, f"shard_{i:03d}.wav")
+        jobs.append((shard_wav, write_condensed(wav, group, shard_wav)))
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        srts = list(pool.map(lambda job: run_whisperx(job[0], tmp, threads), jobs))
+    if any(srt is None for srt in srts):
+        return None
+    return stitch_cues([time_map.remap(read_srt(srt)) for (_, time_map), srt in zip(jobs, srts)])
+
+
+def transcribe(
+    video: str,
+    out_dir: str,
+    vad: bool = False,
+    noise_db: float = -35.0,
+    min_silence: float = 2.0,
+    shards: int = 1,
+) -> Optional[str]:
+    """Writes <out_dir>/<video stem>.srt and returns its path, or None if WhisperX failed."""
+    if not vad and shards <= 1:
+        return run_whisperx(video, out_dir)
+
+    srt_path = os.path.join(out_dir, os.path.splitext(os.path.basename(video))[0] + ".srt")
+    with tempfile.TemporaryDirectory(prefix="weverse_vad_") as tmp:
+        wav = os.path.join(tmp, "audio.wav")
+        extract_audio(video, wav)
+        duration = wav_duration(wav)
+        silences = detect_silences(wav, noise_db=noise_db, min_silence=min_silence)
+        METRICS.incr("audio_seconds", duration)
+
+        if vad:
+            regions = speech_regions(silences, duration)
+            speech = sum(b - a for a, b in regions)
+            print(f"Speech: {speech:.0f}s of {duration:.0f}s in {len(regions)} regions")
+            METRICS.incr("speech_seconds", speech)
+            if not regions:
+                write_srt(srt_path, [])
+                return srt_path
+            groups = plan_shards(regions, shards)
+        else:
+            # Keep all audio; only cut it at silences so no word is split between shards.
+            groups = [[(g[0][0], g[-1][1])] for g in plan_shards(silence_cut_ranges(silences, duration), shards)]
+
+        if len(groups) > 1:
+            print(f"Transcribing {len(groups)} shards in parallel")
+        # WhisperX on CPU uses every core by default; share them out between the shards.
+        threads = max(1, (os.cpu_count() or 1) // len(groups)) if len(groups) > 1 else 0
+        cues = transcribe_shards(wav, groups, tmp, threads)
+        if cues is None:
+            return None
+        write_srt(srt_path, cues)
+    return srt_path
+
+
+def add_vad_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--vad", action="store_true", help="Only transcribe speech; silent stretches are skipped")
+    ap.add_argument("--vad-noise-db", type=float, default=-35.0, help="Level below which audio counts as silence")
+    ap.add_argument("--vad-min-silence", type=float, default=2.0, help="Shortest silence (seconds) that is cut out")
+    ap.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split the audio at silences and run this many WhisperX jobs in parallel",
+    )
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Transcribe/translate a downloaded live with WhisperX.")
+    ap.add_argument("video", help="Video or audio file")
+    ap.add_argument("--out-dir", help="Where to write the SRT (default: next to the video)")
+    add_vad_args(ap)
+    add_metrics_args(ap)
+    add_profile_args(ap)
+    return ap.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    METRICS.script = "weverse_transcribe"
+    out_dir = args.out_dir or os.path.dirname(os.path.abspath(args.video))
+
+    def run() -> int:
+        srt = transcribe(args.video, out_dir, args.vad, args.vad_noise_db, args.vad_min_silence, args.shards)
+        if srt is None:
+            print("Translation failed.")
+            return 1
+        print(f"Subtitle file saved to: {srt}")
+        return 0
+
+    try:
+        return run_profiled(run, args, METRICS.script)
+    finally:
+        write_metrics(args.metrics, args.metrics_format)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())